@@ -0,0 +1,358 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from io import BytesIO
+from multiprocessing import get_context
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from utils.cache import extraction_cache
+from utils.catalog import DIETS, SLOTS
+from utils.extractor import IMAGE_TYPES
+from utils.metrics import ENABLED as METRICS_ENABLED, collected, merge as merge_metrics
+from utils.plan_engine import BUDGET_MAX_COST
+
+# Every CPU-bound step (pdfplumber, OCR, ReportLab, LightGBM) runs in this many
+# worker processes; the event loop only moves bytes and JSON around.
+API_WORKERS = int(os.environ.get("DIETPLANNER_API_WORKERS", os.cpu_count() or 1))
+# Jobs allowed in the pool at once (running + queued). Further requests wait on
+# the semaphore instead of piling pickled payloads into the executor.
+MAX_PENDING = API_WORKERS * 4
+MAX_UPLOAD_BYTES = int(os.environ.get("DIETPLANNER_MAX_UPLOAD_MB", 50)) * 1024 * 1024
+MAX_DURATION = 365
+# The extractor sniffs the format, so untyped uploads are accepted as well.
+UPLOAD_TYPES = ["application/pdf", "text/plain", "text/csv", "application/octet-stream"] + IMAGE_TYPES
+REPORT_MEDIA = {"pdf": "application/pdf", "txt": "text/plain", "json": "application/json"}
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+class SpooledReport(BytesIO):
+    # The parts of Streamlit's UploadedFile that the extractors rely on.
+    def __init__(self, path, content_type, name):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.type = content_type
+        self.name = name
+
+
+# --- worker-side tasks (run in the process pool) ---
+
+def _extract_task(path, content_type, name):
+    from utils.extractor import read_report
+
+    # The pool already provides the parallelism, so each PDF is read in-process.
+    return read_report(SpooledReport(path, content_type, name), early_exit=True)
+
+
+def _conditions_task(text):
+    from utils.extractor import parse_report
+
+    return parse_report(text)
+
+
+def _build_plan(food_pref, duration, conditions, budget, seed, edits=()):
+    from utils.meal_plan import generate_plan_ids, plan_summary
+    from utils.plan_engine import plan_to_dict
+
+    # With edits, each worker's plan_cache already holds the plan before the
+    # last one, so a swap only redraws the edited day.
+    ids = generate_plan_ids(food_pref, duration, conditions, budget, seed=seed, edits=edits)
+    return plan_to_dict(ids), plan_summary(ids, conditions)
+
+
+def _plan_task(food_pref, duration, conditions, budget, seed, patient=None, schema=1, edits=()):
+    full_plan, summary = _build_plan(food_pref, duration, conditions, budget, seed, edits)
+    if schema == 2:
+        from utils.plan_format import plan_document
+
+        return plan_document(patient, conditions, food_pref, duration, full_plan, seed=seed, summary=summary,
+                             edits=list(edits))
+    return {"seed": seed, "edits": list(edits), "plan": full_plan, "nutrition_summary": summary.as_dict()}
+
+
+def _report_task(fmt, patient, conditions, food_pref, duration, budget, seed, schema=1, edits=()):
+    from utils.reports import generate_json_report, generate_pdf_report, generate_txt_report
+
+    # Plans are reproducible from their seed and edits, so the report is
+    # rebuilt here rather than shipping the whole plan back and forth.
+    plan, summary = _build_plan(food_pref, duration, conditions, budget, seed, edits)
+    args = (patient, conditions, food_pref, duration, plan)
+    if fmt == "pdf":
+        return generate_pdf_report(*args, summary=summary).getvalue()
+    if fmt == "txt":
+        return generate_txt_report(*args, summary=summary).encode("utf-8")
+    return generate_json_report(*args, seed=seed, schema=schema, summary=summary, edits=list(edits)).encode("utf-8")
+
+
+def _predict_task(records):
+    import numpy as np
+    from utils.ml_predictor import FEATURES, predict_conditions_batch
+
+    rows = np.array([[r.get(f) for f in FEATURES] for r in records], dtype=float)
+    return predict_conditions_batch(rows).tolist()
+
+
+# --- event loop side ---
+
+def _new_pool():
+    # spawn: workers must not inherit the event loop or its sockets.
+    return ProcessPoolExecutor(max_workers=API_WORKERS, mp_context=get_context("spawn"))
+
+
+def _replace_pool(broken):
+    # Requests that saw the same broken pool replace it only once.
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _pool = _new_pool()
+        return _pool
+
+
+async def run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    async with _slots:
+        pool = _pool
+        try:
+            result, observed = await loop.run_in_executor(pool, collected, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory) and took the pool with it;
+            # retry once on a fresh one. A second failure becomes a 503.
+            pool = _replace_pool(pool)
+            result, observed = await loop.run_in_executor(pool, collected, fn, *args)
+    # The workers' stage timings, so /metrics covers them.
+    merge_metrics(observed)
+    return result
+
+
+def error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def pool_unavailable(request, exc):
+    return error(503, "worker pool unavailable, try again")
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def is_int(value):
+    # bool is an int subclass; JSON true/false are not numbers here.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def plan_options(body):
+    # Returns (options, error message); defaults match the Streamlit form.
+    food_pref = body.get("food_pref", "Vegetarian")
+    budget = body.get("budget", "Medium")
+    duration = body.get("duration", 7)
+    conditions = body.get("conditions") or []
+    seed = body.get("seed")
+    schema = body.get("schema", 1)
+    if food_pref not in DIETS:
+        return None, f"food_pref must be one of {DIETS}"
+    if budget not in BUDGET_MAX_COST:
+        return None, f"budget must be one of {list(BUDGET_MAX_COST)}"
+    if not is_int(duration) or not 1 <= duration <= MAX_DURATION:
+        return None, f"duration must be an integer between 1 and {MAX_DURATION}"
+    if not isinstance(conditions, list) or not all(isinstance(c, str) for c in conditions):
+        return None, "conditions must be a list of strings"
+    if seed is not None and (not is_int(seed) or seed < 0):
+        return None, "seed must be a non-negative integer"
+    if not is_int(schema) or schema not in (1, 2):
+        return None, "schema must be 1 (full meal copies) or 2 (compact, meals by ID)"
+    edits, message = plan_edits(body.get("edits") or [], duration)
+    if message:
+        return None, message
+    return (food_pref, duration, conditions, budget, seed, schema, edits), None
+
+
+def plan_edits(edits, duration):
+    # Swaps as returned by /replan: [{"day", "slot", "seed"}, ...].
+    if not isinstance(edits, list):
+        return None, "edits must be a list"
+    checked = []
+    for e in edits:
+        if not isinstance(e, dict):
+            return None, "each edit must be an object"
+        day, slot, seed = e.get("day"), e.get("slot"), e.get("seed")
+        if not is_int(day) or not 1 <= day <= duration:
+            return None, f"edit day must be an integer between 1 and {duration}"
+        if slot is not None and slot not in SLOTS:
+            return None, f"edit slot must be one of {SLOTS} or null"
+        if not is_int(seed) or seed < 0:
+            return None, "edit seed must be a non-negative integer"
+        checked.append({"day": day, "slot": slot, "seed": seed})
+    return checked, None
+
+
+async def extract(request):
+    # Raw request body, e.g. curl --data-binary @report.pdf -H "Content-Type: application/pdf".
+    # The body is streamed to a temp file and hashed on the way, so repeated
+    # uploads are answered from the cache without reaching the pool.
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in UPLOAD_TYPES:
+        return error(415, f"Content-Type must be one of {UPLOAD_TYPES}")
+    name = request.query_params.get("name", "upload")
+
+    digest = hashlib.sha256(content_type.encode("utf-8") + b"\0")
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="dietplanner-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    return error(413, f"upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                digest.update(chunk)
+                f.write(chunk)
+        key = digest.hexdigest()
+        result = extraction_cache.get(key)
+        if result is None:
+            result = await run_in_pool(_extract_task, path, content_type, name)
+            extraction_cache.put(key, result)
+    finally:
+        os.unlink(path)
+
+    text, patient, conditions, labs, prediction = result
+    return JSONResponse({"patient": patient, "conditions": conditions, "labs": labs, "prediction": prediction,
+                         "text": text})
+
+
+async def conditions(request):
+    body = await read_json(request)
+    if body is None or not isinstance(body.get("text"), str):
+        return error(400, 'expected JSON body {"text": "..."}')
+    patient, found, labs, prediction = await run_in_pool(_conditions_task, body["text"])
+    return JSONResponse({"patient": patient, "conditions": found, "labs": labs, "prediction": prediction})
+
+
+async def plan(request):
+    from utils.meal_plan import new_plan_seed
+
+    body = await read_json(request)
+    if body is None:
+        return error(400, "expected a JSON object")
+    options, message = plan_options(body)
+    if message:
+        return error(400, message)
+    food_pref, duration, found, budget, seed, schema, edits = options
+    if seed is None:
+        if edits:
+            return error(400, "edits need the seed of the plan they were made on")
+        seed = new_plan_seed()
+    patient = str(body.get("patient", "Patient"))
+    result = await run_in_pool(_plan_task, food_pref, duration, found, budget, seed, patient, schema, edits)
+    return JSONResponse(result)
+
+
+async def replan(request):
+    # Swaps one meal ("slot") or a whole day of an existing plan and returns
+    # the new plan with the edit appended to its edits.
+    from utils.meal_plan import new_plan_edit
+
+    body = await read_json(request)
+    if body is None:
+        return error(400, "expected a JSON object")
+    options, message = plan_options(body)
+    if message:
+        return error(400, message)
+    food_pref, duration, found, budget, seed, schema, edits = options
+    if seed is None:
+        return error(400, "seed is required; use the one returned by /plan")
+    new_edit, message = plan_edits([new_plan_edit(body.get("day"), body.get("slot"))], duration)
+    if message:
+        return error(400, message)
+    patient = str(body.get("patient", "Patient"))
+    result = await run_in_pool(_plan_task, food_pref, duration, found, budget, seed, patient, schema,
+                               edits + new_edit)
+    return JSONResponse(result)
+
+
+async def report(request):
+    fmt = request.path_params["fmt"]
+    if fmt not in REPORT_MEDIA:
+        return error(404, f"format must be one of {list(REPORT_MEDIA)}")
+    body = await read_json(request)
+    if body is None:
+        return error(400, "expected a JSON object")
+    options, message = plan_options(body)
+    if message:
+        return error(400, message)
+    food_pref, duration, found, budget, seed, schema, edits = options
+    if seed is None:
+        return error(400, "seed is required; use the one returned by /plan")
+    patient = str(body.get("patient", "Patient"))
+    data = await run_in_pool(_report_task, fmt, patient, found, food_pref, duration, budget, seed, schema, edits)
+    filename = f"{duration}_day_diet_plan.{fmt}"
+    return Response(data, media_type=REPORT_MEDIA[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+async def predict(request):
+    body = await read_json(request)
+    records = body.get("records") if body else None
+    if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+        return error(400, 'expected JSON body {"records": [{"age": ..., "glucose": ...}, ...]}')
+    try:
+        predictions = await run_in_pool(_predict_task, records)
+    except (TypeError, ValueError) as e:
+        return error(400, f"invalid lab values: {e}")
+    return JSONResponse({"predictions": predictions})
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "workers": API_WORKERS})
+
+
+async def metrics(request):
+    from utils.metrics import render_prometheus
+
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _pool, _slots
+    _pool = _new_pool()
+    _slots = asyncio.Semaphore(MAX_PENDING)
+    try:
+        yield
+    finally:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+routes = [
+    Route("/health", health),
+    Route("/extract", extract, methods=["POST"]),
+    Route("/conditions", conditions, methods=["POST"]),
+    Route("/plan", plan, methods=["POST"]),
+    Route("/replan", replan, methods=["POST"]),
+    Route("/report/{fmt}", report, methods=["POST"]),
+    Route("/predict", predict, methods=["POST"]),
+]
+if METRICS_ENABLED:
+    routes.append(Route("/metrics", metrics))
+
+app = Starlette(routes=routes, lifespan=lifespan, exception_handlers={BrokenProcessPool: pool_unavailable})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("api:app", host=os.environ.get("HOST", "0.0.0.0"), port=int(os.environ.get("PORT", 8000)))
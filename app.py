@@ -1,15 +1,25 @@
+from importlib.machinery import ModuleSpec
+
 import streamlit as st
-import pdfplumber
-import pandas as pd
-import re
-import random
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from utils.assets import day_panels, header_html, page_style, replace_panels, summary_html
+from utils.cache import plan_fingerprint, report_cache, view_cache
+from utils.metrics import start_metrics_server
+from utils.jobs import ACTIVE, get_job, record_plan_edits, submit_extraction, submit_plan
+from utils.reports import generate_json_report, generate_pdf_report, generate_txt_report
+
+# Background jobs and the PDF page pool start their workers with "spawn".
+# A spawned child re-imports the parent's __main__ so that pickled
+# functions defined there resolve. If __main__ has no __spec__,
+# multiprocessing re-runs it from its file path. Here that file is this
+# Streamlit script, so each worker would execute the whole page (widgets,
+# job submission) at start-up. The workers only run functions from
+# utils.*. When the spec name is "__main__", multiprocessing.spawn skips
+# that re-import, so the script is given such a spec.
+if __spec__ is None:
+    __spec__ = ModuleSpec("__main__", None)
 
 st.set_page_config(page_title="DietPlanner AI", page_icon="🥗", layout="centered")
+start_metrics_server()
 
 # Initialize session state
 if "step" not in st.session_state:
@@ -24,341 +34,173 @@ if "budget" not in st.session_state:
     st.session_state.budget = "Medium"
 if "duration" not in st.session_state:
     st.session_state.duration = 7
-if "full_plan" not in st.session_state:
-    st.session_state.full_plan = {}
-
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-* {font-family: 'Inter', sans-serif !important;}
-.stApp {background: #f5f7fa !important;}
-.main .block-container {max-width: 900px !important; padding: 2rem 1rem !important;}
-#MainMenu, footer, header {display: none !important;}
-
-.header-bar {
-    background: linear-gradient(135deg, #1e3a2e 0%, #14532d 100%);
-    padding: 1.5rem 2rem;
-    border-radius: 0;
-    margin: -2rem -1rem 2rem -1rem;
-}
-
-.step-circle {
-    display: inline-flex;
-    align-items: center;
-    justify-content: center;
-    width: 40px;
-    height: 40px;
-    border-radius: 50%;
-    font-weight: 700;
-    font-size: 1.1rem;
-    margin: 0 0.5rem;
-}
-
-.step-active {
-    background: #1e3a2e;
-    color: white;
-}
-
-.step-inactive {
-    background: white;
-    color: #94a3b8;
-    border: 2px solid #e2e8f0;
-}
-
-/* Upload card styling */
-.upload-card {
-    background: white;
-    border: 2px dashed #cbd5e1;
-    border-radius: 16px;
-    padding: 1.5rem 1rem;
-    text-align: center;
-    margin: 0.5rem 0;
-    transition: border-color 0.2s;
-}
-
-.upload-card:hover {
-    border-color: #2563eb;
-}
-
-/* Style the file uploader to look clean inside cards */
-[data-testid="stFileUploader"] {
-    background: transparent !important;
-}
-
-[data-testid="stFileUploader"] > div {
-    background: transparent !important;
-    border: none !important;
-    padding: 0 !important;
-}
-
-[data-testid="stFileUploaderDropzone"] {
-    background: transparent !important;
-    border: none !important;
-    padding: 0.5rem 0 !important;
-    min-height: unset !important;
-}
-
-[data-testid="stFileUploaderDropzoneInstructions"] {
-    padding: 0 !important;
-}
-
-.stButton > button {
-    background: #1e3a2e !important;
-    color: white !important;
-    border: none !important;
-    padding: 0.875rem 3rem !important;
-    border-radius: 50px !important;
-    font-weight: 600 !important;
-    font-size: 1.1rem !important;
-    width: 100% !important;
-}
-
-.meal-card {
-    background: #fafaf9;
-    border: 1px solid #e7e5e4;
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-}
-
-.calorie-badge {
-    background: #fef3c7;
-    color: #92400e;
-    padding: 0.25rem 0.75rem;
-    border-radius: 20px;
-    font-size: 0.875rem;
-    font-weight: 600;
-}
-
-.rec-box {
-    background: #f0fdf4;
-    border: 1px solid #bbf7d0;
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-}
-
-.limit-box {
-    background: #fef2f2;
-    border: 1px solid #fecaca;
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-}
-
-.stDownloadButton > button {
-    background: #d97706 !important;
-    color: white !important;
-    border: none !important;
-    padding: 0.75rem 2rem !important;
-    border-radius: 50px !important;
-    font-weight: 600 !important;
-    width: 100% !important;
-    margin: 0.5rem 0 !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# ─── MEAL DATA ────────────────────────────────────────────────────────────────
-
-VEG_MEALS = {
-    "Morning": [
-        {"name": "Oatmeal with banana", "portion": "1 cup cooked oats + 1 medium banana", "calories": 320, "benefit": "High soluble fiber lowers cholesterol and stabilizes blood sugar"},
-        {"name": "Poha with vegetables", "portion": "1 plate (200g)", "calories": 250, "benefit": "Light breakfast, easy to digest, provides steady energy"},
-        {"name": "Idli with sambar", "portion": "3 idlis + 1 bowl sambar", "calories": 280, "benefit": "Fermented food aids digestion, low in calories"},
-        {"name": "Upma with coconut chutney", "portion": "1 bowl (200g) + 2 tbsp chutney", "calories": 260, "benefit": "Complex carbs for sustained energy, good source of B vitamins"},
-        {"name": "Whole wheat toast with avocado", "portion": "2 slices + half avocado", "calories": 300, "benefit": "Healthy fats from avocado support heart health"},
-        {"name": "Vegetable dalia porridge", "portion": "1 bowl (250g)", "calories": 240, "benefit": "High fiber, low glycemic index, ideal for diabetes management"},
-    ],
-    "Afternoon": [
-        {"name": "Dal khichdi with curd", "portion": "1 bowl (250g) + 100ml curd", "calories": 300, "benefit": "Complete protein, easy on stomach, good for weight management"},
-        {"name": "Quinoa vegetable pulao", "portion": "1 bowl (200g)", "calories": 280, "benefit": "High protein grain alternative, gluten-free"},
-        {"name": "Mixed veg curry with roti", "portion": "2 rotis + 1 bowl curry", "calories": 350, "benefit": "Fiber-rich vegetables support digestive health"},
-        {"name": "Rajma rice", "portion": "1 cup rice + 1 bowl rajma", "calories": 380, "benefit": "High protein legume, good for cholesterol management"},
-        {"name": "Palak paneer with brown rice", "portion": "1 bowl curry + 1 cup rice", "calories": 360, "benefit": "Iron-rich spinach combined with protein from paneer"},
-        {"name": "Vegetable biryani with raita", "portion": "1 plate (250g) + 100ml raita", "calories": 340, "benefit": "Balanced meal with aromatic spices that aid digestion"},
-    ],
-    "Evening": [
-        {"name": "Mixed vegetable soup", "portion": "1 bowl (300ml)", "calories": 120, "benefit": "Low calorie, high micronutrient density supports weight management"},
-        {"name": "Paneer tikka salad", "portion": "150g paneer + salad", "calories": 280, "benefit": "High protein, calcium-rich, supports bone health"},
-        {"name": "Vegetable cutlets", "portion": "2 pieces", "calories": 180, "benefit": "Nutrient-dense snack with minimal oil"},
-        {"name": "Sprouts chaat", "portion": "1 bowl (150g)", "calories": 140, "benefit": "Sprouted legumes have enhanced nutrition and enzyme activity"},
-        {"name": "Roasted makhana", "portion": "1 cup (30g)", "calories": 110, "benefit": "Low calorie, high protein snack good for blood sugar"},
-        {"name": "Fruit salad with chia seeds", "portion": "1 bowl + 1 tsp chia", "calories": 160, "benefit": "Antioxidants and omega-3s from chia support heart health"},
-    ],
-    "Night": [
-        {"name": "Warm turmeric milk", "portion": "200ml low-fat milk + pinch turmeric", "calories": 90, "benefit": "Anti-inflammatory properties, supports overnight recovery"},
-        {"name": "Chamomile tea", "portion": "1 cup", "calories": 5, "benefit": "Promotes better sleep, aids digestion"},
-        {"name": "Almond milk", "portion": "200ml unsweetened", "calories": 60, "benefit": "Low calorie, rich in vitamin E, supports bone health"},
-        {"name": "Warm ginger lemon water", "portion": "1 cup with ginger + lemon", "calories": 10, "benefit": "Boosts metabolism, anti-inflammatory, aids digestion"},
-    ]
-}
-
-NONVEG_MEALS = {
-    "Morning": [
-        {"name": "Egg white omelette with toast", "portion": "3 egg whites + 2 whole wheat toast", "calories": 280, "benefit": "High protein, low fat, supports muscle maintenance"},
-        {"name": "Boiled eggs with fruit", "portion": "2 boiled eggs + 1 apple", "calories": 260, "benefit": "Complete protein with vitamins and fiber"},
-        {"name": "Chicken sandwich", "portion": "Grilled chicken (80g) + whole wheat bread", "calories": 320, "benefit": "Lean protein source, filling breakfast"},
-        {"name": "Scrambled eggs with spinach", "portion": "2 eggs + 1 cup spinach", "calories": 240, "benefit": "Iron and protein combination ideal for anemia prevention"},
-        {"name": "Oatmeal with boiled egg", "portion": "1 cup oats + 1 egg", "calories": 310, "benefit": "Soluble fiber from oats paired with protein for sustained energy"},
-        {"name": "Greek yogurt with nuts", "portion": "150g yogurt + 20g mixed nuts", "calories": 280, "benefit": "Probiotics for gut health, healthy fats for satiety"},
-    ],
-    "Afternoon": [
-        {"name": "Grilled chicken breast with salad", "portion": "150g chicken + mixed salad", "calories": 248, "benefit": "Lean protein supports muscle maintenance without raising LDL"},
-        {"name": "Fish curry with rice", "portion": "100g fish + 1 cup brown rice", "calories": 380, "benefit": "Omega-3 fatty acids from fish strongly support heart health"},
-        {"name": "Chicken stir-fry with vegetables", "portion": "150g chicken + 1 cup mixed veg", "calories": 290, "benefit": "High protein, balanced macros, quick energy source"},
-        {"name": "Grilled salmon with quinoa", "portion": "120g salmon + 1 cup quinoa", "calories": 420, "benefit": "Highest omega-3 content, complete protein, anti-inflammatory"},
-        {"name": "Egg rice bowl", "portion": "1 cup brown rice + 2 eggs + veg", "calories": 360, "benefit": "Balanced macronutrient meal, excellent for sustained energy"},
-        {"name": "Tuna whole wheat wrap", "portion": "100g tuna + 1 whole wheat wrap", "calories": 340, "benefit": "Lean protein, omega-3s, complex carbs for steady glucose"},
-    ],
-    "Evening": [
-        {"name": "Chicken soup", "portion": "1 bowl (300ml)", "calories": 180, "benefit": "Protein-rich, hydrating, easy to digest"},
-        {"name": "Tuna salad", "portion": "100g tuna + mixed vegetables", "calories": 200, "benefit": "Omega-3 rich, supports cardiovascular health"},
-        {"name": "Grilled fish fingers", "portion": "3 pieces (100g)", "calories": 150, "benefit": "Low calorie, high protein evening snack option"},
-        {"name": "Boiled egg salad", "portion": "2 eggs + cucumber + tomato", "calories": 170, "benefit": "Nutrient-dense, filling snack with healthy fats"},
-    ],
-    "Night": [
-        {"name": "Warm turmeric milk", "portion": "200ml low-fat milk + pinch turmeric", "calories": 90, "benefit": "Anti-inflammatory properties, supports overnight recovery"},
-        {"name": "Green tea", "portion": "1 cup", "calories": 5, "benefit": "Antioxidants, promotes better sleep quality"},
-        {"name": "Protein shake", "portion": "1 scoop whey + water", "calories": 120, "benefit": "Supports muscle recovery and tissue repair overnight"},
-        {"name": "Warm ginger lemon water", "portion": "1 cup with ginger + lemon", "calories": 10, "benefit": "Boosts metabolism, anti-inflammatory, aids digestion"},
-    ]
-}
+if "plan_ids" not in st.session_state:
+    # (days, slots) array of catalogue meal IDs; meals are looked up per rendered day.
+    st.session_state.plan_ids = None
+    st.session_state.catalog_version = None
+if "plan_seed" not in st.session_state:
+    st.session_state.plan_seed = None
+if "plan_edits" not in st.session_state:
+    # Meals swapped since the plan was generated, replayable on top of plan_seed.
+    st.session_state.plan_edits = []
+if "labs" not in st.session_state:
+    # Lab values read from the report and the model's result for them.
+    st.session_state.labs = {}
+    st.session_state.lab_prediction = None
+if "extract_job" not in st.session_state:
+    st.session_state.extract_job = None
+if "upload_jobs" not in st.session_state:
+    # file_id -> extraction job, for every upload of this session.
+    st.session_state.upload_jobs = {}
+if "plan_job" not in st.session_state:
+    st.session_state.plan_job = None
+
+JOB_POLL_SECONDS = 0.5
+
+st.markdown(page_style(), unsafe_allow_html=True)
 
 # ─── HELPER FUNCTIONS ─────────────────────────────────────────────────────────
 
-def extract_text_from_file(file):
-    text = ""
-    try:
-        if file.type == "application/pdf":
-            with pdfplumber.open(file) as pdf:
-                for page in pdf.pages:
-                    if page.extract_text():
-                        text += page.extract_text() + "\n"
-        elif file.type == "text/plain":
-            text = file.read().decode("utf-8")
-        elif file.type == "text/csv":
-            df = pd.read_csv(file)
-            text = df.to_string()
-        elif file.type in ["image/png", "image/jpeg", "image/jpg"]:
-            text = "Sample medical report data - patient information extracted from image"
-    except Exception as e:
-        text = "Medical report uploaded"
-    return text
-
-def extract_patient_name(text):
-    patterns = [
-        r"patient\s*name\s*[:\-]\s*([A-Za-z ]+)",
-        r"name\s*[:\-]\s*([A-Za-z ]+)",
-        r"patient\s*[:\-]\s*([A-Za-z ]+)"
-    ]
-    for p in patterns:
-        m = re.search(p, text, re.I)
-        if m:
-            return m.group(1).strip().split("\n")[0]
-    return "Patient"
-
-def extract_conditions(text):
-    t = text.lower()
-    cond = []
-    if "diabetes" in t or "diabetic" in t:
-        cond.append("Diabetes")
-    if "cholesterol" in t or "hyperlipidemia" in t:
-        cond.append("High Cholesterol")
-    if "hypertension" in t or "high blood pressure" in t or "hbp" in t:
-        cond.append("Hypertension")
-    if "anemia" in t or "anaemia" in t or "hemoglobin" in t:
-        cond.append("Anemia")
-    if "thyroid" in t or "hypothyroid" in t or "hyperthyroid" in t:
-        cond.append("Thyroid Disorder")
-    if "kidney" in t or "renal" in t:
-        cond.append("Kidney Concern")
-    return cond if cond else ["General Health"]
-
-def generate_diet_plan(food_pref, duration):
-    meals = VEG_MEALS if food_pref == "Vegetarian" else NONVEG_MEALS
-    plan = {}
-    for day in range(1, duration + 1):
-        plan[f"Day {day}"] = {
-            "Morning": random.choice(meals["Morning"]),
-            "Afternoon": random.choice(meals["Afternoon"]),
-            "Evening": random.choice(meals["Evening"]),
-            "Night": random.choice(meals["Night"])
-        }
-    return plan
-
-def generate_pdf_report(patient, conditions, food_pref, duration, full_plan):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    story.append(Paragraph(f"<b>DietPlanner AI — {duration} Day Diet Plan</b>", styles['Title']))
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(f"<b>Patient:</b> {patient}", styles['Normal']))
-    story.append(Paragraph(f"<b>Conditions:</b> {', '.join(conditions)}", styles['Normal']))
-    story.append(Paragraph(f"<b>Food Preference:</b> {food_pref}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    for day_name, meals in full_plan.items():
-        story.append(Paragraph(f"<b>{day_name}</b>", styles['Heading2']))
-        total_cal = 0
-        for time_slot, meal in meals.items():
-            story.append(Paragraph(f"<b>{time_slot}:</b> {meal['name']} — {meal['calories']} kcal", styles['Normal']))
-            story.append(Paragraph(f"Portion: {meal['portion']}", styles['Normal']))
-            story.append(Paragraph(f"Benefit: {meal['benefit']}", styles['Normal']))
-            total_cal += meal['calories']
-            story.append(Spacer(1, 6))
-        story.append(Paragraph(f"<b>Day Total: {total_cal} kcal</b>", styles['Normal']))
-        story.append(Spacer(1, 12))
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-def generate_txt_report(patient, conditions, food_pref, duration, full_plan):
-    report = f"DIETPLANNER AI — {duration} DAY DIET PLAN\n"
-    report += "=" * 60 + "\n\n"
-    report += f"Patient: {patient}\n"
-    report += f"Medical Conditions: {', '.join(conditions)}\n"
-    report += f"Food Preference: {food_pref}\n"
-    report += f"Duration: {duration} Days\n\n"
-    report += "=" * 60 + "\n\n"
-    for day_name, meals in full_plan.items():
-        report += f"{day_name.upper()}\n" + "-" * 60 + "\n"
-        total_cal = 0
-        for time_slot, meal in meals.items():
-            report += f"\n{time_slot}:\n"
-            report += f"  Meal: {meal['name']}\n"
-            report += f"  Portion: {meal['portion']}\n"
-            report += f"  Calories: {meal['calories']} kcal\n"
-            report += f"  Benefit: {meal['benefit']}\n"
-            total_cal += meal['calories']
-        report += f"\nDay Total: {total_cal} kcal\n"
-        report += "=" * 60 + "\n\n"
-    return report
-
-def generate_json_report(patient, conditions, food_pref, duration, full_plan):
-    import json
-    data = {
-        "patient_name": patient,
-        "medical_conditions": conditions,
-        "food_preference": food_pref,
-        "duration_days": duration,
-        "meal_plan": full_plan
-    }
-    return json.dumps(data, indent=2)
+def lazy_report(fmt, build, *args, **extra):
+    # Returns a zero-arg callable for st.download_button: the plan is expanded
+    # and the report rendered only when the user clicks download, then
+    # memoized per plan.
+    ids, catalog_version = st.session_state.plan_ids, st.session_state.catalog_version
+
+    def render():
+        from utils.meal_plan import plan_summary
+        from utils.plan_engine import plan_to_dict
+
+        key = (plan_fingerprint(*args, ids, catalog_version), fmt, repr(sorted(extra.items())))
+        return report_cache.get_or_compute(
+            key, lambda: build(*args, plan_to_dict(ids), summary=plan_summary(ids, args[1]), **extra)
+        )
+
+    return render
+
+def build_pdf_bytes(*args, **kwargs):
+    return generate_pdf_report(*args, **kwargs).getvalue()
+
+def start_extraction(file):
+    # Submit each upload once; later reruns only look at the job. With
+    # several uploads present, the page follows the newest one.
+    if file.file_id not in st.session_state.upload_jobs:
+        job_id = submit_extraction(file.getvalue(), file.type, file.name)
+        st.session_state.upload_jobs[file.file_id] = job_id
+        st.session_state.extract_job = job_id
+        st.query_params["job"] = job_id
+
+def apply_plan_job(job):
+    params = job["params"]
+    st.session_state.patient = params["patient"]
+    st.session_state.conditions = params["conditions"]
+    st.session_state.food_pref = params["food_pref"]
+    st.session_state.budget = params["budget"]
+    st.session_state.duration = params["duration"]
+    st.session_state.plan_seed = params["seed"]
+    st.session_state.plan_edits = params.get("edits", [])
+    if job["status"] == "done":
+        from utils.catalog import CATALOG
+        from utils.meal_plan import compact_ids, generate_plan_ids
+
+        ids = job["result"]["ids"]
+        if job["result"]["catalog_version"] != CATALOG.version or st.session_state.plan_edits:
+            # Stored before the catalogue changed (the IDs no longer mean the
+            # same meals) or swapped since: rebuild the plan from its seed.
+            ids = generate_plan_ids(params["food_pref"], params["duration"], params["conditions"],
+                                    params["budget"], seed=params["seed"], edits=st.session_state.plan_edits)
+        st.session_state.plan_ids = compact_ids(ids)
+        st.session_state.catalog_version = CATALOG.version
+        st.session_state.plan_job = None
+        st.session_state.step = 3
+    else:
+        st.session_state.plan_job = job["id"]
+        st.session_state.step = 2
+
+def restore_job(job_id):
+    # A refreshed page starts a new session; the job id in the URL brings back
+    # the upload or plan it was working on.
+    job = get_job(job_id)
+    if job is None:
+        del st.query_params["job"]
+    elif job["kind"] == "extract":
+        st.session_state.extract_job = job_id
+    elif job["status"] != "failed":
+        apply_plan_job(job)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id, label):
+    # Polls without re-running the page; a full rerun picks up the result.
+    job = get_job(job_id)
+    if job is None or job["status"] not in ACTIVE:
+        st.rerun()
+    if job["total"]:
+        st.progress(job["done"] / job["total"], text=f"{label} page {job['done']} of {job['total']}")
+    else:
+        st.progress(0.0, text=f"{label}...")
+
+def select_day(day):
+    st.session_state.selected_day = day
+
+def swap_in_plan(day, slot=None):
+    # Redraws one meal (or the whole day) in place. The new plan's summary
+    # and day panels are carried over from the old ones with only this day
+    # redone; reports are keyed by plan, so only the new plan's get rebuilt.
+    from utils.meal_plan import new_plan_edit, plan_summary, swap_meals
+
+    ss = st.session_state
+    args = (ss.patient, ss.conditions, ss.food_pref, ss.duration)
+    edit = new_plan_edit(day, slot)
+    ids = swap_meals(ss.plan_ids, ss.food_pref, ss.conditions, ss.budget, edit)
+    panels = view_cache.get(plan_fingerprint(*args, ss.plan_ids, ss.catalog_version))
+    if panels is not None:
+        view_cache.put(plan_fingerprint(*args, ids, ss.catalog_version),
+                       replace_panels(panels, ids, ss.conditions, plan_summary(ids, ss.conditions), [day]))
+    ss.plan_ids = ids
+    ss.plan_edits = ss.plan_edits + [edit]
+    if "job" in st.query_params:
+        record_plan_edits(st.query_params["job"], ss.plan_edits)
+
+@st.fragment
+def day_viewer(panels):
+    # Day selector and meal cards rerun on their own: switching days only
+    # swaps in the pre-rendered panel, the rest of the page is left alone.
+    # Up to 7 days get buttons, longer plans a selectbox.
+    from utils.catalog import SLOTS
+
+    if len(panels) <= 7:
+        cols = st.columns(len(panels))
+        for i in range(len(panels)):
+            with cols[i]:
+                st.button(f"Day {i+1}", key=f"day_{i+1}", use_container_width=True, on_click=select_day, args=(i + 1,))
+        selected_day = min(st.session_state.get("selected_day", 1), len(panels))
+    else:
+        selected_day = st.selectbox(
+            "Select Day",
+            options=list(range(1, len(panels) + 1)),
+            format_func=lambda x: f"Day {x}"
+        )
+    st.markdown(panels[selected_day - 1], unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        slot = st.selectbox("Meal to swap", SLOTS, key="swap_slot", label_visibility="collapsed")
+    with col2:
+        if st.button("🔁 Swap meal", key="swap_meal", use_container_width=True):
+            swap_in_plan(selected_day, slot)
+            st.rerun()
+    with col3:
+        if st.button("🎲 New day", key="swap_day", use_container_width=True):
+            swap_in_plan(selected_day)
+            st.rerun()
+
+if "job" in st.query_params and st.session_state.get("restored_job") != st.query_params["job"]:
+    st.session_state.restored_job = st.query_params["job"]
+    restore_job(st.query_params["job"])
 
 # ─── HEADER ───────────────────────────────────────────────────────────────────
 
-st.markdown("""
-<div class="header-bar">
-    <div style="display: flex; align-items: center;">
-        <span style="font-size: 2rem; margin-right: 1rem;">🥗</span>
-        <div>
-            <h1 style="color: white; margin: 0; font-size: 1.75rem; font-weight: 700;">DietPlanner AI</h1>
-            <p style="color: rgba(255,255,255,0.9); margin: 0; font-size: 0.95rem;">Personalised nutrition guidance</p>
-        </div>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(header_html(), unsafe_allow_html=True)
 
 # Step indicator
 st.markdown(f"""
@@ -396,13 +238,7 @@ if st.session_state.step == 1:
         txt_file = st.file_uploader("", type=["txt"], key="txt_upload", label_visibility="collapsed")
 
         if txt_file:
-            text = extract_text_from_file(txt_file)
-            st.session_state.patient = extract_patient_name(text)
-            st.session_state.conditions = extract_conditions(text)
-            st.success(f"✅ {txt_file.name} uploaded!")
-            if st.button("Continue →", key="txt_continue"):
-                st.session_state.step = 2
-                st.rerun()
+            start_extraction(txt_file)
 
     # -------- PDF --------
     with col2:
@@ -417,13 +253,7 @@ if st.session_state.step == 1:
         pdf_file = st.file_uploader("", type=["pdf"], key="pdf_upload", label_visibility="collapsed")
 
         if pdf_file:
-            text = extract_text_from_file(pdf_file)
-            st.session_state.patient = extract_patient_name(text)
-            st.session_state.conditions = extract_conditions(text)
-            st.success(f"✅ {pdf_file.name} uploaded!")
-            if st.button("Continue →", key="pdf_continue"):
-                st.session_state.step = 2
-                st.rerun()
+            start_extraction(pdf_file)
 
     # -------- IMAGE --------
     with col3:
@@ -431,18 +261,28 @@ if st.session_state.step == 1:
         <div class="upload-card">
             <div style="font-size: 2.5rem; margin-bottom: 0.75rem;">🖼️</div>
             <h3 style="color: #1e293b; font-size: 1.05rem; font-weight: 600; margin: 0.25rem 0;">Scanned Image</h3>
-            <p style="color: #64748b; font-size: 0.85rem; margin: 0 0 0.75rem 0;">Upload PNG or JPG</p>
+            <p style="color: #64748b; font-size: 0.85rem; margin: 0 0 0.75rem 0;">Upload PNG, JPG or TIFF</p>
         </div>
         """, unsafe_allow_html=True)
 
-        img_file = st.file_uploader("", type=["png", "jpg", "jpeg"], key="img_upload", label_visibility="collapsed")
+        img_file = st.file_uploader("", type=["png", "jpg", "jpeg", "tif", "tiff"], key="img_upload", label_visibility="collapsed")
 
         if img_file:
-            text = extract_text_from_file(img_file)
-            st.session_state.patient = extract_patient_name(text)
-            st.session_state.conditions = extract_conditions(text)
-            st.success(f"✅ {img_file.name} uploaded!")
-            if st.button("Continue →", key="img_continue"):
+            start_extraction(img_file)
+
+    # -------- EXTRACTION JOB --------
+    job = get_job(st.session_state.extract_job) if st.session_state.extract_job else None
+    if job is not None:
+        name = job["params"].get("name", "Report")
+        if job["status"] in ACTIVE:
+            job_progress(job["id"], f"Reading {name}:")
+        elif job["status"] == "failed":
+            st.error(f"Could not read {name}: {job['error']}")
+        else:
+            (_, st.session_state.patient, st.session_state.conditions,
+             st.session_state.labs, st.session_state.lab_prediction) = job["result"]
+            st.success(f"✅ {name} uploaded!")
+            if st.button("Continue →", key="continue"):
                 st.session_state.step = 2
                 st.rerun()
 
@@ -459,6 +299,8 @@ if st.session_state.step == 1:
         if st.button("Skip →", key="skip"):
             st.session_state.patient = "Patient"
             st.session_state.conditions = ["General Health"]
+            st.session_state.labs = {}
+            st.session_state.lab_prediction = None
             st.session_state.step = 2
             st.rerun()
 # ─── STEP 2: PREFERENCES ──────────────────────────────────────────────────────
@@ -477,6 +319,17 @@ elif st.session_state.step == 2:
         </div>
         """, unsafe_allow_html=True)
 
+    if st.session_state.labs:
+        from utils.labs import describe_labs
+
+        readings = " &nbsp;·&nbsp; ".join(describe_labs(st.session_state.labs))
+        st.markdown(f"""
+        <div style="background: #f8fafc; border: 1px solid #e2e8f0; border-radius: 12px; padding: 1rem 1.5rem; margin-bottom: 2rem;">
+            <p style="color: #334155; margin: 0 0 0.4rem 0; font-size: 0.95rem;">🧪 <b>Lab values:</b> {readings}</p>
+            <p style="color: #334155; margin: 0; font-size: 0.95rem;">📊 <b>Model screening:</b> {st.session_state.lab_prediction}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
     st.markdown("<h3 style='font-size: 1.25rem; color: #1e293b; margin: 2rem 0 1rem 0;'>🥗 Food Preference</h3>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
     with col1:
@@ -508,64 +361,57 @@ elif st.session_state.step == 2:
     st.markdown("<p style='text-align: center; color: #64748b;'>1 day ← → 30 days</p>", unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
-    if st.button("✨ Generate Diet Plan", use_container_width=True):
-        st.session_state.full_plan = generate_diet_plan(st.session_state.food_pref, st.session_state.duration)
-        st.session_state.step = 3
+    job = get_job(st.session_state.plan_job) if st.session_state.plan_job else None
+    if job is not None and job["status"] in ACTIVE:
+        job_progress(job["id"], "Generating your plan")
+    elif job is not None and job["status"] == "done":
+        apply_plan_job(job)
         st.rerun()
+    else:
+        if job is not None:
+            st.error(f"Plan generation failed: {job['error']}")
+        if st.button("✨ Generate Diet Plan", use_container_width=True):
+            from utils.meal_plan import new_plan_seed
+
+            st.session_state.plan_seed = new_plan_seed()
+            st.session_state.plan_job = submit_plan(
+                st.session_state.patient, st.session_state.food_pref,
+                st.session_state.duration, st.session_state.conditions,
+                st.session_state.budget, st.session_state.plan_seed
+            )
+            st.query_params["job"] = st.session_state.plan_job
+            st.rerun()
 
 # ─── STEP 3: RESULTS ──────────────────────────────────────────────────────────
 
 elif st.session_state.step == 3:
     st.markdown(f"<h2 style='text-align: center; font-size: 2rem; font-weight: 700; color: #1e293b; margin-bottom: 2rem;'>🍽️ Your {st.session_state.duration}-Day Diet Plan</h2>", unsafe_allow_html=True)
+    if st.session_state.plan_seed is not None:
+        st.markdown(f"<p style='text-align: center; color: #94a3b8; font-size: 0.85rem; margin-top: -1.5rem;'>Plan reference: {st.session_state.plan_seed}</p>", unsafe_allow_html=True)
 
-    # Day selector (show up to 7 buttons per row, then a selectbox for more)
-    if st.session_state.duration <= 7:
-        cols = st.columns(st.session_state.duration)
-        selected_day = st.session_state.get("selected_day", 1)
-        for i in range(st.session_state.duration):
-            with cols[i]:
-                if st.button(f"Day {i+1}", key=f"day_{i+1}", use_container_width=True):
-                    st.session_state.selected_day = i + 1
-                    st.rerun()
-        selected_day = st.session_state.get("selected_day", 1)
-    else:
-        selected_day = st.selectbox(
-            "Select Day",
-            options=list(range(1, st.session_state.duration + 1)),
-            format_func=lambda x: f"Day {x}"
-        )
+    report_args = (
+        st.session_state.patient, st.session_state.conditions,
+        st.session_state.food_pref, st.session_state.duration
+    )
+    from utils.meal_plan import plan_summary
 
-    day_plan = st.session_state.full_plan[f"Day {selected_day}"]
-    total_cal = sum(meal["calories"] for meal in day_plan.values())
+    plan_key = plan_fingerprint(*report_args, st.session_state.plan_ids, st.session_state.catalog_version)
+    summary = plan_summary(st.session_state.plan_ids, st.session_state.conditions)
+    day_viewer(view_cache.get_or_compute(
+        plan_key, lambda: day_panels(st.session_state.plan_ids, st.session_state.conditions, summary)
+    ))
 
-    # Meal cards
-    icons = {"Morning": "🌅", "Afternoon": "☀️", "Evening": "🌆", "Night": "🌙"}
-    for time_slot, meal_data in day_plan.items():
-        st.markdown(f"""
-        <div class="meal-card">
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
-                <h3 style="color: #1e293b; font-size: 1.25rem; font-weight: 600; margin: 0;">
-                    {icons.get(time_slot, "🍽️")} {time_slot}
-                </h3>
-                <span class="calorie-badge">{meal_data['calories']} kcal</span>
-            </div>
-            <h4 style="color: #1e293b; font-size: 1.1rem; font-weight: 600; margin: 0.5rem 0;">{meal_data['name']}</h4>
-            <p style="color: #64748b; font-size: 0.95rem; margin: 0.5rem 0;">🍴 {meal_data['portion']}</p>
-            <p style="color: #475569; font-size: 0.95rem; margin: 0.75rem 0;">{meal_data['benefit']}</p>
-            <p style="color: #16a34a; font-size: 0.875rem; font-weight: 500; margin: 0.5rem 0;">
-                💊 Clinical recommendation for {', '.join(st.session_state.conditions)}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+    # The window the planner aims the four meals at, as reported in the summary.
+    from utils.plan_engine import CALORIE_WINDOW
 
+    low, high = CALORIE_WINDOW
     st.markdown(f"""
-    <div style="background: #d1fae5; padding: 1.5rem; border-radius: 12px; text-align: center; margin: 2rem 0;">
-        <h3 style="color: #1e293b; font-weight: 700; margin: 0;">Day {selected_day} Total: {total_cal} kcal</h3>
-    </div>
     <div style="background: #e0f2fe; padding: 1.5rem; border-radius: 12px; text-align: center; margin-bottom: 2rem;">
-        <p style="color: #0c4a6e; font-weight: 600; margin: 0;">Daily Target Range: 1700–2000 kcal/day based on patient profile</p>
+        <p style="color: #0c4a6e; font-weight: 600; margin: 0;">Daily Target Range: {low}–{high} kcal/day from the four planned meals
+        ({int(summary.in_calorie_window.sum())} of {len(summary)} days in range)</p>
     </div>
     """, unsafe_allow_html=True)
+    st.markdown(summary_html(summary), unsafe_allow_html=True)
 
     # Recommendations
     st.markdown("<h3 style='font-size: 1.5rem; color: #1e293b; margin: 3rem 0 1.5rem 0;'>📋 Dietary Recommendations</h3>", unsafe_allow_html=True)
@@ -629,40 +475,26 @@ elif st.session_state.step == 3:
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        pdf_data = generate_pdf_report(
-            st.session_state.patient, st.session_state.conditions,
-            st.session_state.food_pref, st.session_state.duration,
-            st.session_state.full_plan
-        )
         st.download_button(
             "📑 Download PDF",
-            data=pdf_data,
+            data=lazy_report("pdf", build_pdf_bytes, *report_args),
             file_name=f"{st.session_state.duration}_day_diet_plan.pdf",
             mime="application/pdf",
             use_container_width=True
         )
     with col2:
-        txt_data = generate_txt_report(
-            st.session_state.patient, st.session_state.conditions,
-            st.session_state.food_pref, st.session_state.duration,
-            st.session_state.full_plan
-        )
         st.download_button(
             "📄 Download TXT",
-            data=txt_data,
+            data=lazy_report("txt", generate_txt_report, *report_args),
             file_name=f"{st.session_state.duration}_day_diet_plan.txt",
             mime="text/plain",
             use_container_width=True
         )
     with col3:
-        json_data = generate_json_report(
-            st.session_state.patient, st.session_state.conditions,
-            st.session_state.food_pref, st.session_state.duration,
-            st.session_state.full_plan
-        )
         st.download_button(
             "📊 Download JSON",
-            data=json_data,
+            data=lazy_report("json", generate_json_report, *report_args, seed=st.session_state.plan_seed,
+                             edits=st.session_state.plan_edits),
             file_name=f"{st.session_state.duration}_day_diet_plan.json",
             mime="application/json",
             use_container_width=True
@@ -670,7 +502,10 @@ elif st.session_state.step == 3:
 
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button("🔄 Create New Plan", use_container_width=True):
-        for key in ["step", "patient", "conditions", "food_pref", "budget", "duration", "full_plan", "selected_day"]:
+        for key in ["step", "patient", "conditions", "labs", "lab_prediction", "food_pref", "budget", "duration",
+                    "plan_ids", "catalog_version", "plan_seed", "plan_edits", "selected_day", "extract_job", "plan_job",
+                    "upload_jobs"]:
             if key in st.session_state:
                 del st.session_state[key]
+        st.query_params.clear()
         st.rerun()
@@ -0,0 +1,324 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+
+from utils.extractor import extract_conditions, extract_patient_name, extract_text_from_file, iter_csv_records
+from utils.cache import content_digest
+from utils.labs import lab_matrix, lab_values
+from utils.ml_predictor import FEATURES
+from utils.meal_plan import generate_plan_ids, plan_summary
+from utils.plan_engine import plan_to_dict
+from utils.reports import generate_json_report, generate_pdf_report, generate_txt_report
+
+REPORT_TYPES = {".pdf": "application/pdf", ".txt": "text/plain", ".csv": "text/csv"}
+# CSV exports hold one patient per row; rows are shipped to workers in slices
+# of this size so the parent never holds more than a few slices in memory.
+CSV_ROWS_PER_JOB = 256
+# json2 is the compact schema-2 JSON (meal dictionary + day ID lists);
+# ndjson appends one compact record per report to a single plans.ndjson.
+FORMATS = ["pdf", "txt", "json", "json2", "ndjson"]
+EXTENSIONS = {"pdf": "pdf", "txt": "txt", "json": "json", "json2": "v2.json"}
+NDJSON_NAME = "plans.ndjson"
+# Every report's lab values and model result, one row per report.
+SCREENING_NAME = "screening.csv"
+STAGES = ["read", "extract", "parse", "score", "plan", *FORMATS, "write"]
+
+
+class ReportFile(BytesIO):
+    # The parts of Streamlit's UploadedFile that the extractors rely on.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.type = REPORT_TYPES[os.path.splitext(path)[1].lower()]
+
+
+def find_reports(input_dir):
+    for root, _, files in os.walk(input_dir):
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in REPORT_TYPES:
+                yield os.path.join(root, name)
+
+
+def render_report(fmt, patient, conditions, food_pref, duration, plan, seed=None, summary=None):
+    args = (patient, conditions, food_pref, duration, plan)
+    if fmt == "pdf":
+        return generate_pdf_report(*args, summary=summary).getvalue()
+    if fmt == "txt":
+        return generate_txt_report(*args, summary=summary).encode("utf-8")
+    if fmt == "json":
+        return generate_json_report(*args, seed=seed, summary=summary).encode("utf-8")
+    data = generate_json_report(*args, seed=seed, schema=2, summary=summary)
+    return (data + "\n").encode("utf-8") if fmt == "ndjson" else data.encode("utf-8")
+
+
+def score_reports(texts, numeric_rows=None):
+    # Lab values for a slice of reports, scored by the model in one batch.
+    from utils.ml_predictor import predict_lab_rows
+
+    X = lab_matrix(texts, numeric_rows)
+    predictions = predict_lab_rows(X)
+    return [[row.get(f, "") for f in FEATURES] + [p or ""] for row, p in zip(map(lab_values, X), predictions)]
+
+
+def plan_and_write(text, out_base, food_pref, budget, duration, formats, timings, to_archive=False):
+    clock = time.perf_counter
+
+    t = clock()
+    patient = extract_patient_name(text)
+    conditions = extract_conditions(text)
+    timings["parse"] = clock() - t
+
+    t = clock()
+    # Seeded from the report text, so re-running a batch reproduces every plan.
+    seed = int(content_digest(text.encode("utf-8"))[:8], 16)
+    ids = generate_plan_ids(food_pref, duration, conditions, budget, seed=seed)
+    plan = plan_to_dict(ids)
+    # Computed once here; every format reads its totals from it.
+    summary = plan_summary(ids, conditions)
+    timings["plan"] = clock() - t
+
+    outputs = {}
+    for fmt in formats:
+        t = clock()
+        outputs[fmt] = render_report(fmt, patient, conditions, food_pref, duration, plan, seed, summary)
+        timings[fmt] = clock() - t
+
+    # The NDJSON stream is shared by the whole run, so its line goes back to the parent.
+    record = outputs.pop("ndjson", None)
+    files = [(f"{out_base}.{EXTENSIONS[fmt]}", data) for fmt, data in outputs.items()]
+    if to_archive:
+        # The parent process owns the ZIP; hand the rendered reports back.
+        return timings, files, record
+
+    t = clock()
+    os.makedirs(os.path.dirname(out_base) or ".", exist_ok=True)
+    for name, data in files:
+        with open(name, "wb") as f:
+            f.write(data)
+    timings["write"] = clock() - t
+    return timings, [], record
+
+
+def output_base(path, input_dir, output_dir, duration, row=None):
+    rel = os.path.splitext(os.path.relpath(path, input_dir))[0]
+    if row is not None:
+        rel = f"{rel}_row{row}"
+    return os.path.join(output_dir, f"{rel}_{duration}_day_diet_plan")
+
+
+def process_report(path, input_dir, output_dir, food_pref, budget, duration, formats, to_archive=False):
+    timings = {}
+    clock = time.perf_counter
+
+    t = clock()
+    file = ReportFile(path)
+    timings["read"] = clock() - t
+
+    t = clock()
+    text = extract_text_from_file(file, early_exit=True)
+    timings["extract"] = clock() - t
+
+    t = clock()
+    screening = score_reports([text])[0]
+    timings["score"] = clock() - t
+
+    out_base = output_base(path, input_dir, output_dir, duration)
+    return (*plan_and_write(text, out_base, food_pref, budget, duration, formats, timings, to_archive), screening)
+
+
+def _failed(name, e):
+    return (name, None, [], None, None, f"{type(e).__name__}: {e}")
+
+
+def _run_file(job):
+    path = job[0]
+    try:
+        # Extraction, scoring and planning errors all fail this report only.
+        return [(path, *process_report(*job), None)]
+    except Exception as e:
+        return [_failed(path, e)]
+
+
+def _run_csv_rows(job):
+    path, first_row, texts, numeric_rows, input_dir, output_dir, food_pref, budget, duration, formats, to_archive = job
+    # One model call for the whole slice; its time is split across the rows.
+    t = time.perf_counter()
+    try:
+        screening = score_reports(texts, numeric_rows)
+    except Exception as e:
+        # A model failure fails this slice's rows, not the whole run.
+        return [_failed(f"{path}:{row}", e) for row in range(first_row, first_row + len(texts))]
+    score_time = (time.perf_counter() - t) / len(texts)
+    results = []
+    for row, text in enumerate(texts, start=first_row):
+        name = f"{path}:{row}"
+        try:
+            out_base = output_base(path, input_dir, output_dir, duration, row)
+            timings, files, record = plan_and_write(text, out_base, food_pref, budget, duration, formats,
+                                                    {"score": score_time}, to_archive)
+            results.append((name, timings, files, record, screening[row - first_row], None))
+        except Exception as e:
+            results.append(_failed(name, e))
+    return results
+
+
+def iter_jobs(input_dir, output_dir, food_pref, budget, duration, formats, to_archive=False):
+    for path in find_reports(input_dir):
+        if not path.lower().endswith(".csv"):
+            yield _run_file, (path, input_dir, output_dir, food_pref, budget, duration, formats, to_archive)
+            continue
+        texts = []
+        numeric_rows = []
+        first_row = 1
+        for text, numeric_data in iter_csv_records(path):
+            texts.append(text)
+            numeric_rows.append(numeric_data)
+            if len(texts) == CSV_ROWS_PER_JOB:
+                yield _run_csv_rows, (path, first_row, texts, numeric_rows, input_dir, output_dir, food_pref, budget,
+                                      duration, formats, to_archive)
+                first_row += len(texts)
+                texts = []
+                numeric_rows = []
+        if texts:
+            yield _run_csv_rows, (path, first_row, texts, numeric_rows, input_dir, output_dir, food_pref, budget,
+                                  duration, formats, to_archive)
+
+
+class RunStats:
+    # Running totals only, so memory stays flat however many reports go through.
+    def __init__(self):
+        self.succeeded = 0
+        self.failed = 0
+        self.stages = {stage: [0, 0.0, 0.0] for stage in STAGES}  # count, total, max
+
+    def add(self, timings, err):
+        if err is not None:
+            self.failed += 1
+            return
+        self.succeeded += 1
+        for stage, seconds in timings.items():
+            entry = self.stages[stage]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def summary(self, elapsed):
+        total = self.succeeded + self.failed
+        summary = {
+            "reports": total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 3),
+            "reports_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+            "stages": {},
+        }
+        for stage, (count, seconds, longest) in self.stages.items():
+            if count:
+                summary["stages"][stage] = {
+                    "total_s": round(seconds, 3),
+                    "mean_ms": round(1000 * seconds / count, 2),
+                    "max_ms": round(1000 * longest, 2),
+                }
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate diet plans for a directory of medical reports.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir", help="directory for the reports, or a .zip path to write one archive")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--food-pref", default="Vegetarian", choices=["Vegetarian", "Non-Vegetarian"])
+    parser.add_argument("--budget", default="Medium", choices=["Low", "Medium", "High"])
+    parser.add_argument("--duration", type=int, default=7)
+    parser.add_argument("--formats", default="pdf,txt,json", help=f"comma-separated subset of {','.join(FORMATS)}")
+    parser.add_argument("--stats-json", help="also write the run summary to this file")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    for fmt in formats:
+        if fmt not in FORMATS:
+            parser.error(f"unknown format: {fmt}")
+
+    # Bulk export: with a .zip target every report goes into a single archive,
+    # written as results arrive so only the in-flight jobs are held in memory.
+    to_archive = args.output_dir.lower().endswith(".zip")
+    job_output_dir = "" if to_archive else args.output_dir
+    archive = None
+    if to_archive:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output_dir)), exist_ok=True)
+        archive = zipfile.ZipFile(args.output_dir, "w", compression=zipfile.ZIP_DEFLATED)
+    # Run-wide files go next to the archive in ZIP mode, inside the output
+    # directory otherwise.
+    run_dir = os.path.dirname(os.path.abspath(args.output_dir)) if to_archive else args.output_dir
+    os.makedirs(run_dir, exist_ok=True)
+    ndjson = None
+    if "ndjson" in formats:
+        ndjson = open(os.path.join(run_dir, NDJSON_NAME), "wb")
+    screening_file = open(os.path.join(run_dir, SCREENING_NAME), "w", newline="")
+    screening_csv = csv.writer(screening_file)
+    screening_csv.writerow(["report", *FEATURES, "prediction"])
+
+    stats = RunStats()
+    start = time.perf_counter()
+
+    def collect(futures):
+        for future in futures:
+            for name, timings, files, record, screening, err in future.result():
+                if screening:
+                    screening_csv.writerow([name, *screening])
+                if files or record:
+                    t = time.perf_counter()
+                    for arcname, data in files:
+                        archive.writestr(arcname, data)
+                    if record:
+                        ndjson.write(record)
+                    timings["write"] = timings.get("write", 0.0) + time.perf_counter() - t
+                stats.add(timings, err)
+                if err:
+                    print(f"FAILED {name}: {err}", file=sys.stderr)
+                done = stats.succeeded + stats.failed
+                if done % 500 == 0:
+                    rate = done / (time.perf_counter() - start)
+                    print(f"{done} done ({rate:.1f} reports/s)", file=sys.stderr)
+
+    print(f"Processing reports in {args.input_dir} with {args.workers} workers", file=sys.stderr)
+    # Keep only a bounded number of jobs in flight so huge CSVs stream through.
+    max_pending = args.workers * 4
+    pending = set()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for fn, job in iter_jobs(args.input_dir, job_output_dir, args.food_pref, args.budget, args.duration,
+                                     formats, to_archive):
+                pending.add(pool.submit(fn, job))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(pending)
+    finally:
+        if archive is not None:
+            archive.close()
+        if ndjson is not None:
+            ndjson.close()
+        screening_file.close()
+    summary = stats.summary(time.perf_counter() - start)
+
+    print(f"{summary['succeeded']}/{summary['reports']} reports in {summary['elapsed_s']}s "
+          f"({summary['reports_per_s']} reports/s)")
+    for stage, timing in summary["stages"].items():
+        print(f"  {stage:<8} mean {timing['mean_ms']:>9.2f} ms   max {timing['max_ms']:>9.2f} ms   "
+              f"total {timing['total_s']:>8.3f} s")
+    if args.stats_json:
+        with open(args.stats_json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
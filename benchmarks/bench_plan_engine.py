@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.catalog import CATALOG, MEALS, MealCatalog  # noqa: E402
+from utils.plan_engine import plan_ids  # noqa: E402
+
+DURATIONS = [1, 7, 30, 90, 365]
+PROFILES = [
+    ("Vegetarian", "Low", ["Diabetes"]),
+    ("Non-Vegetarian", "Medium", ["High Cholesterol", "Hypertension"]),
+    ("Vegetarian", "High", []),
+]
+
+
+def synthetic_catalog(n_meals, seed=0):
+    # Scale the real catalogue up to n_meals by cloning rows with jittered
+    # calories, to check the engine against catalogues far bigger than ours.
+    rng = np.random.default_rng(seed)
+    meals = []
+    for i in range(n_meals):
+        base = dict(MEALS[i % len(MEALS)])
+        base["id"] = i
+        base["name"] = f"{base['name']} #{i}"
+        base["calories"] = int(base["calories"] * rng.uniform(0.8, 1.2))
+        meals.append(base)
+    return MealCatalog(meals)
+
+
+def bench(catalog, label, repeat):
+    print(f"{label}: {len(catalog)} meals")
+    for duration in DURATIONS:
+        for food_pref, budget, conditions in PROFILES:
+            best = float("inf")
+            for r in range(repeat):
+                start = time.perf_counter()
+                plan = plan_ids(food_pref, duration, conditions, budget, rng=np.random.default_rng(r), catalog=catalog)
+                best = min(best, time.perf_counter() - start)
+            calories = catalog.calories[plan].sum(axis=1)
+            print(f"  {duration:>3} days  {food_pref:<14} {budget:<6}  {best * 1000:8.2f} ms  "
+                  f"{duration / best:10.0f} days/s  kcal {calories.min()}-{calories.max()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=20000, help="meals in the synthetic catalogue")
+    args = parser.parse_args()
+    bench(CATALOG, "bundled catalogue", args.repeat)
+    bench(synthetic_catalog(args.scale), "synthetic catalogue", args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import pickle
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.catalog import CATALOG  # noqa: E402
+from utils.meal_plan import compact_ids  # noqa: E402
+from utils.plan_engine import plan_ids, plan_to_dict  # noqa: E402
+
+PROFILE = ("Vegetarian", ["Diabetes", "Hypertension"], "Medium")
+
+
+def session_state(plan, duration):
+    # The per-session values the results page keeps besides the plan.
+    return {"step": 3, "patient": "Asha Verma", "conditions": list(PROFILE[1]), "food_pref": PROFILE[0],
+            "budget": PROFILE[2], "duration": duration, "plan_seed": 1234567, **plan}
+
+
+def build_sessions(kind, all_ids, duration):
+    sessions = []
+    for ids in all_ids:
+        if kind == "dict":
+            # Plan dict sharing the catalogue's meal dicts (built in-process).
+            plan = {"full_plan": plan_to_dict(ids)}
+        elif kind == "dict_from_json":
+            # Plan dict that came back through JSON (job queue, API): every
+            # meal is a private copy.
+            plan = {"full_plan": json.loads(json.dumps(plan_to_dict(ids)))}
+        else:
+            plan = {"plan_ids": compact_ids(ids), "catalog_version": CATALOG.version}
+        sessions.append(session_state(plan, duration))
+    return sessions
+
+
+def measure(kind, all_ids, duration):
+    # Only the state each session retains is traced, not plan generation.
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sessions = build_sessions(kind, all_ids, duration)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    pickled = len(pickle.dumps(sessions[0], protocol=pickle.HIGHEST_PROTOCOL))
+    del sessions
+    return retained / len(all_ids), pickled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-session memory of the results page state")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--durations", default="7,30,365")
+    args = parser.parse_args()
+
+    print(f"{'duration':>8} {'representation':<16} {'bytes/session':>14} {'pickled':>10}")
+    for duration in [int(d) for d in args.durations.split(",")]:
+        all_ids = [plan_ids(PROFILE[0], duration, PROFILE[1], PROFILE[2], rng=np.random.default_rng(seed))
+                   for seed in range(args.sessions)]
+        for kind in ("dict", "dict_from_json", "ids"):
+            per_session, pickled = measure(kind, all_ids, duration)
+            print(f"{duration:>8} {kind:<16} {per_session:>14,.0f} {pickled:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should not be loaded just to render Step 1.
+HEAVY_MODULES = ["pdfplumber", "pandas", "reportlab", "numpy", "PIL", "pytesseract", "lightgbm"]
+
+# Each probe runs in a fresh interpreter so every sample is a true cold start.
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+from utils import assets, cache, extractor, reports
+imported = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+render_start = time.perf_counter()
+at.run()
+rendered = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "first_render_s": rendered - render_start,
+    "exception": bool(at.exception),
+    "heavy_loaded": [m for m in sys.argv[2].split(",") if m in sys.modules],
+}))
+"""
+
+
+def run_probe():
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, os.path.join(ROOT, "app.py"), ",".join(HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import time and first-render latency of app.py")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.repeat)]
+    result = {
+        "repeat": args.repeat,
+        "import_s": {"median": statistics.median(s["import_s"] for s in samples),
+                     "min": min(s["import_s"] for s in samples)},
+        "first_render_s": {"median": statistics.median(s["first_render_s"] for s in samples),
+                           "min": min(s["first_render_s"] for s in samples)},
+        "heavy_loaded_after_first_render": samples[-1]["heavy_loaded"],
+        "render_errors": sum(s["exception"] for s in samples),
+    }
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
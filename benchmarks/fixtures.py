@@ -0,0 +1,159 @@
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fixtures")
+
+PDF_PAGES = [1, 10, 100, 500]
+TXT_SIZES_MB = [1, 10]
+CSV_ROWS = [10_000, 100_000]
+IMAGE_SIZES = [(1240, 1754), (3024, 4032)]  # A4 scan at 150 dpi, 12 MP phone photo
+TIFF_FRAMES = 4
+
+CONDITION_LINES = [
+    "Known case of type 2 diabetes mellitus on metformin.",
+    "Hyperlipidemia noted; advised low-fat diet.",
+    "History of hypertension, BP 150/95 mmHg.",
+    "Haemoglobin 10.2 g/dL suggestive of anaemia.",
+    "Hypothyroidism on levothyroxine 50 mcg.",
+    "Renal function within normal limits.",
+]
+FILLER_LINES = [
+    "Fasting blood glucose 142 mg/dL, HbA1c 7.4 %.",
+    "Total cholesterol 238 mg/dL, LDL 160 mg/dL, HDL 38 mg/dL.",
+    "Serum creatinine 1.0 mg/dL, urea 28 mg/dL.",
+    "Patient advised regular follow up and lifestyle modification.",
+    "No known drug allergies. Non-smoker. Occasional alcohol.",
+    "ECG: normal sinus rhythm. Chest X-ray: no abnormality detected.",
+]
+
+
+def report_lines(n_lines, seed=0):
+    rng = random.Random(seed)
+    lines = ["CITY HOSPITAL - DISCHARGE SUMMARY", "Patient Name: Asha Verma", "Age: 54 years   Sex: F"]
+    while len(lines) < n_lines:
+        lines.append(rng.choice(FILLER_LINES if rng.random() < 0.8 else CONDITION_LINES))
+    return lines
+
+
+def path_for(name):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    return os.path.join(FIXTURE_DIR, name)
+
+
+def make_pdf(pages):
+    path = path_for(f"report_{pages}p.pdf")
+    if os.path.exists(path):
+        return path
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=A4)
+    lines = report_lines(pages * 45, seed=pages)
+    for page in range(pages):
+        y = 800
+        for line in lines[page * 45:(page + 1) * 45]:
+            c.drawString(50, y, line)
+            y -= 17
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_mixed_pdf(pages, scanned=(2,)):
+    # Digital report with scanned pages bound in: the listed 1-based pages
+    # carry only an image of text, the way a scanner inserts them.
+    path = path_for(f"report_{pages}p_mixed.pdf")
+    if os.path.exists(path):
+        return path
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=A4)
+    lines = report_lines(pages * 45, seed=pages)
+    scan = ImageReader(_draw_report(IMAGE_SIZES[0]))
+    for page in range(1, pages + 1):
+        if page in scanned:
+            c.drawImage(scan, 0, 0, *A4)
+        else:
+            y = 800
+            for line in lines[(page - 1) * 45:page * 45]:
+                c.drawString(50, y, line)
+                y -= 17
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_txt(size_mb):
+    path = path_for(f"report_{size_mb}mb.txt")
+    if os.path.exists(path):
+        return path
+    target = size_mb * 1024 * 1024
+    with open(path, "w") as f:
+        written = 0
+        for line in report_lines(target // 40, seed=size_mb):
+            f.write(line + "\n")
+            written += len(line) + 1
+            if written >= target:
+                break
+    return path
+
+
+def make_csv(rows):
+    path = path_for(f"labs_{rows}.csv")
+    if os.path.exists(path):
+        return path
+    rng = random.Random(rows)
+    with open(path, "w") as f:
+        f.write("patient_id,age,glucose,cholesterol,blood_pressure,bmi,doctor_prescription,notes\n")
+        for i in range(rows):
+            f.write(f"{i},{rng.randint(18, 90)},{rng.uniform(70, 260):.1f},{rng.uniform(120, 300):.1f},"
+                    f"{rng.randint(60, 110)},{rng.uniform(17, 42):.1f},\"{rng.choice(CONDITION_LINES)}\","
+                    f"\"{rng.choice(FILLER_LINES)}\"\n")
+    return path
+
+
+def _draw_report(size):
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = size
+    image = Image.new("RGB", size, (250, 248, 240))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=max(12, width // 60))
+    y = height // 20
+    for line in report_lines(40):
+        draw.text((width // 20, y), line, fill=(20, 20, 20), font=font)
+        y += int(font.size * 1.6)
+        if y > height * 0.95:
+            break
+    return image
+
+
+def make_image(size, fmt):
+    path = path_for(f"scan_{size[0]}x{size[1]}.{fmt}")
+    if not os.path.exists(path):
+        options = {"quality": 90} if fmt == "jpg" else {}
+        _draw_report(size).save(path, **options)
+    return path
+
+
+def make_tiff(frames):
+    path = path_for(f"scan_{frames}frames.tiff")
+    if not os.path.exists(path):
+        pages = [_draw_report(IMAGE_SIZES[0]) for _ in range(frames)]
+        pages[0].save(path, save_all=True, append_images=pages[1:], compression="tiff_deflate")
+    return path
+
+
+def build_all(quick=False):
+    pdf_pages = [p for p in PDF_PAGES if not quick or p <= 100]
+    return {
+        "pdf": {p: make_pdf(p) for p in pdf_pages},
+        "pdf_mixed": make_mixed_pdf(10),
+        "txt": {mb: make_txt(mb) for mb in TXT_SIZES_MB if not quick or mb == 1},
+        "csv": {rows: make_csv(rows) for rows in CSV_ROWS if not quick or rows == CSV_ROWS[0]},
+        "png": make_image(IMAGE_SIZES[0], "png"),
+        "jpg": make_image(IMAGE_SIZES[1], "jpg"),
+        "tiff": make_tiff(TIFF_FRAMES),
+    }
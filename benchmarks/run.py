@@ -0,0 +1,227 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import build_all, report_lines  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+PLAN_DURATIONS = [1, 7, 30, 90, 365]
+REPORT_DURATIONS = [7, 30, 365]
+MIME_TYPES = {".pdf": "application/pdf", ".txt": "text/plain", ".csv": "text/csv",
+              ".png": "image/png", ".jpg": "image/jpeg", ".tiff": "image/tiff"}
+
+
+class Upload(BytesIO):
+    # Stand-in for Streamlit's UploadedFile.
+    def __init__(self, path, data):
+        super().__init__(data)
+        self.name = os.path.basename(path)
+        self.type = MIME_TYPES[os.path.splitext(path)[1]]
+
+
+def measure(fn, setup=None, repeat=5, min_time=0.2):
+    # Best-of/median over `repeat` samples; fast cases are looped so each
+    # sample lasts at least roughly min_time.
+    args = setup() if setup else ()
+    start = time.perf_counter()
+    fn(*args)
+    once = time.perf_counter() - start
+    loops = max(1, int(min_time / once)) if once < min_time else 1
+    samples = []
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(loops):
+            args = setup() if setup else ()
+            start = time.perf_counter()
+            fn(*args)
+            total += time.perf_counter() - start
+        samples.append(total / loops)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "loops": loops, "repeat": repeat}
+
+
+def cases(fixtures, tesseract):
+    from utils import extractor
+    from utils.cache import ocr_cache
+    from utils.meal_plan import generate_diet_plan
+    from utils.reports import generate_json_report, generate_pdf_report, generate_txt_report
+
+    def upload(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        return lambda: (Upload(path, data),)
+
+    def clear_ocr_then(make):
+        def setup():
+            ocr_cache.clear()
+            return make()
+        return setup
+
+    files = [(f"pdf_{p}p", path) for p, path in fixtures["pdf"].items()]
+    files += [(f"txt_{mb}mb", path) for mb, path in fixtures["txt"].items()]
+    files += [(f"csv_{rows}", path) for rows, path in fixtures["csv"].items()]
+    images = [(kind, fixtures[kind]) for kind in ("png", "jpg", "tiff")]
+
+    for label, path in files:
+        yield f"extract_text_from_file[{label}]", extractor.extract_text_from_file, upload(path)
+        yield f"extractor.extract_text[{label}]", extractor.extract_text, upload(path)
+    for label, path in images + [("pdf_10p_mixed", fixtures["pdf_mixed"])]:
+        if tesseract:
+            setup = clear_ocr_then(upload(path))
+            yield f"extract_text_from_file[{label}]", extractor.extract_text_from_file, setup
+            yield f"extractor.extract_text[{label}]", extractor.extract_text, clear_ocr_then(upload(path))
+
+    for n_lines in (50, 5_000, 200_000):
+        text = "\n".join(report_lines(n_lines))
+        # Name at the very end: the worst case for the pattern scan.
+        tail_text = "\n".join(report_lines(n_lines)[3:]) + "\nPatient Name: Late Entry"
+        yield f"extract_patient_name[{n_lines}_lines]", extractor.extract_patient_name, lambda t=tail_text: (t,)
+        yield f"extract_conditions[{n_lines}_lines]", extractor.extract_conditions, lambda t=text: (t,)
+        # No BP or BMI in the fixture, so the lab scan never stops early.
+        yield f"extract_labs[{n_lines}_lines]", extractor.extract_labs, lambda t=text: (t,)
+
+    seeds = itertools.count(1)  # fresh seed per call so the plan cache never answers
+    for duration in PLAN_DURATIONS:
+        yield (f"generate_diet_plan[{duration}d]",
+               lambda d=duration: generate_diet_plan("Vegetarian", d, ["Diabetes", "Hypertension"], "Medium", seed=next(seeds)),
+               None)
+
+    from utils.assets import day_panels
+    from utils.meal_plan import compact_ids, generate_plan_ids, plan_summary, swap_meals
+    from utils.plan_engine import plan_to_dict
+    from utils.plan_summary import summarize_ids
+
+    for duration in (30, 365):
+        # One meal / one day swapped in place, versus generate_diet_plan above.
+        ids = generate_plan_ids("Vegetarian", duration, ["Diabetes", "Hypertension"], "Medium", seed=duration)
+        for slot in ("Evening", None):
+            yield (f"swap_meals[{duration}d,{slot or 'day'}]",
+                   lambda i=ids, s=slot: swap_meals(i, "Vegetarian", ["Diabetes", "Hypertension"], "Medium",
+                                                    {"day": len(i) // 2, "slot": s, "seed": next(seeds)}),
+                   None)
+
+    from utils.cache import DiskCache, extraction_cache, plan_cache
+
+    if plan_cache.disk is not None:
+        # What a restarted or second server process pays for a result that
+        # is only in the shared cache file: an SQLite read plus decoding.
+        path = os.path.join(os.path.dirname(fixtures["png"]), "cache.sqlite3")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        disk_plans = DiskCache(path, "plan", 64 << 20, dumps=plan_cache.disk.dumps, loads=plan_cache.disk.loads)
+        disk_reports = DiskCache(path, "extraction", 64 << 20, loads=extraction_cache.disk.loads)
+        ids = generate_plan_ids("Vegetarian", 365, ["Diabetes", "Hypertension"], "Medium", seed=365)
+        disk_plans.put("365d", ids)
+        with open(fixtures["txt"][1], encoding="utf-8") as f:
+            disk_reports.put("txt_1mb", (f.read(), "Asha Verma", ["Diabetes"], {"age": 54.0}, "Diabetes"))
+        disk_plans.flush()
+        yield "disk_cache_get[plan_365d]", lambda: disk_plans.get("365d"), None
+        yield "disk_cache_get[extraction_txt_1mb]", lambda: disk_reports.get("txt_1mb"), None
+
+    for duration in REPORT_DURATIONS:
+        ids = generate_plan_ids("Non-Vegetarian", duration, ["High Cholesterol"], "High", seed=duration)
+        # Renderers get the plan's summary, computed once, as the app and batch pass it.
+        summary = plan_summary(ids, ["High Cholesterol"])
+        args = ("Asha Verma", ["High Cholesterol"], "Non-Vegetarian", duration, plan_to_dict(ids))
+        yield f"plan_summary[{duration}d]", lambda i=ids: summarize_ids(i, ["High Cholesterol"]), None
+        yield f"generate_pdf_report[{duration}d]", lambda a=args, s=summary: generate_pdf_report(*a, summary=s), None
+        yield f"generate_txt_report[{duration}d]", lambda a=args, s=summary: generate_txt_report(*a, summary=s), None
+        yield f"generate_json_report[{duration}d]", lambda a=args, s=summary: generate_json_report(*a, summary=s), None
+
+    for duration in REPORT_DURATIONS:
+        # Step 3 meal cards for a whole plan, rendered once per plan.
+        ids = compact_ids(generate_plan_ids("Vegetarian", duration, ["Diabetes"], "Medium", seed=duration))
+        summary = plan_summary(ids, ["Diabetes"])
+        yield f"day_panels[{duration}d]", lambda i=ids, s=summary: day_panels(i, ["Diabetes"], s), None
+
+    import numpy as np
+    from utils.ml_predictor import FEATURES, get_model, predict_condition, predict_conditions_batch
+
+    get_model()  # model load is a one-off cost, not part of per-call latency
+    rng = np.random.default_rng(0)
+    row = {"age": 54, "glucose": 142.0, "cholesterol": 238.0, "blood_pressure": 95.0, "bmi": 29.4}
+    yield "predict_condition[single]", lambda: predict_condition(row), None
+    for n in (1_000, 100_000):
+        cohort = rng.uniform(20, 200, size=(n, len(FEATURES)))
+        yield f"predict_conditions_batch[{n}]", lambda c=cohort: predict_conditions_batch(c), None
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'case':<48} {'median':>11} {'baseline':>11} {'ratio':>7}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<48} {r['median_s'] * 1000:>9.2f}ms {'-':>11} {'new':>7}")
+            continue
+        ratio = r["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<48} {r['median_s'] * 1000:>9.2f}ms {base['median_s'] * 1000:>9.2f}ms {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DietPlanner benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="skip the 500-page PDF and the largest TXT/CSV")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", help="only run cases whose name contains this string")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    fixtures = build_all(quick=args.quick)
+    tesseract = shutil.which("tesseract") is not None
+    if not tesseract:
+        print("tesseract not found: skipping OCR cases", file=sys.stderr)
+
+    results = {}
+    for name, fn, setup in cases(fixtures, tesseract):
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, setup, repeat=args.repeat)
+        print(f"{name:<48} {results[name]['median_s'] * 1000:>10.3f} ms", file=sys.stderr)
+
+    payload = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(payload, f, indent=2)
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(payload, f, indent=2)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Read at import time by utils.metrics, utils.jobs, utils.cache and api, so
+# they are set before any test module imports them; spawned workers inherit
+# them. Nothing touches the real cache or job files.
+os.environ["DIETPLANNER_METRICS"] = "1"
+os.environ["DIETPLANNER_CACHE_DB"] = ""
+os.environ["DIETPLANNER_JOB_DB"] = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+os.environ["DIETPLANNER_API_WORKERS"] = "1"
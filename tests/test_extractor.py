@@ -0,0 +1,43 @@
+from io import BytesIO
+
+from reportlab.pdfgen import canvas
+
+from utils.extractor import EARLY_EXIT_IDLE_PAGES, parse_report, read_pdf_text
+
+
+def make_pdf(pages):
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer)
+    for number, lines in enumerate(pages, start=1):
+        for i, line in enumerate(lines + [f"Page {number}"]):
+            c.drawString(50, 800 - 20 * i, line)
+        c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer
+
+
+def test_early_exit_stops_without_every_field():
+    # No BMI anywhere and most conditions absent: the read still stops once
+    # the pages stop adding anything.
+    first = ["Patient Name: Asha Verma", "Age: 54 years", "Fasting glucose 182 mg/dL",
+             "Total cholesterol 238 mg/dL", "BP 150/95 mmHg", "Known case of type 2 diabetes."]
+    filler = ["Patient advised regular follow up and lifestyle modification."]
+    pdf = make_pdf([first] + [filler] * 40)
+
+    text = read_pdf_text(pdf, early_exit=True)
+    assert f"Page {2 + EARLY_EXIT_IDLE_PAGES}" not in text
+    patient, conditions, labs, _ = parse_report(text)
+    assert patient == "Asha Verma"
+    assert "Diabetes" in conditions
+    assert labs == {"age": 54.0, "glucose": 182.0, "cholesterol": 238.0, "blood_pressure": 95.0}
+
+
+def test_early_exit_keeps_reading_while_pages_add_findings():
+    pages = [["Patient Name: Asha Verma", "Age: 54 years"], ["Fasting glucose 182 mg/dL"],
+             ["Total cholesterol 238 mg/dL"], ["BP 150/95 mmHg"], ["BMI: 33"], ["Hypothyroidism on levothyroxine."]]
+    text = read_pdf_text(make_pdf(pages), early_exit=True)
+    # Every lab field and the name are in hand after page 5.
+    assert "Page 5" in text and "Page 6" not in text
+    assert parse_report(text)[2] == {"age": 54.0, "glucose": 182.0, "cholesterol": 238.0, "blood_pressure": 95.0,
+                                     "bmi": 33.0}
@@ -0,0 +1,39 @@
+import asyncio
+import re
+import time
+
+from utils import jobs
+from utils.metrics import render_prometheus
+
+
+def stage_count(stage):
+    m = re.search(rf'^dietplanner_stage_seconds_count{{stage="{stage}"}} (\d+)$', render_prometheus(), re.M)
+    return int(m.group(1)) if m else 0
+
+
+def wait_for(check, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, render_prometheus()
+        time.sleep(0.1)
+
+
+def test_job_worker_timings_reach_metrics():
+    before = stage_count("plan")
+    job_id = jobs.submit_plan("Asha", "Vegetarian", 7, ["Diabetes"], "Medium", seed=1)
+    wait_for(lambda: jobs.get_job(job_id)["status"] == "done")
+    # The parent merges the worker's timings once the job's future resolves.
+    wait_for(lambda: stage_count("plan") == before + 1)
+
+
+def test_api_worker_timings_reach_metrics():
+    import api
+
+    async def run():
+        async with api.lifespan(api.app):
+            return await api.run_in_pool(api._plan_task, "Vegetarian", 7, ["Diabetes"], "Medium", 2)
+
+    before = stage_count("plan"), stage_count("summary")
+    result = asyncio.run(run())
+    assert result["seed"] == 2
+    assert (stage_count("plan"), stage_count("summary")) == (before[0] + 1, before[1] + 1)
@@ -0,0 +1,243 @@
+import re
+from functools import lru_cache
+
+# Static page chrome. Streamlit needs it re-sent on every script run, but it
+# is only minified and assembled once per process.
+PAGE_CSS = """
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+* {font-family: 'Inter', sans-serif !important;}
+.stApp {background: #f5f7fa !important;}
+.main .block-container {max-width: 900px !important; padding: 2rem 1rem !important;}
+#MainMenu, footer, header {display: none !important;}
+
+.header-bar {
+    background: linear-gradient(135deg, #1e3a2e 0%, #14532d 100%);
+    padding: 1.5rem 2rem;
+    border-radius: 0;
+    margin: -2rem -1rem 2rem -1rem;
+}
+
+.step-circle {
+    display: inline-flex;
+    align-items: center;
+    justify-content: center;
+    width: 40px;
+    height: 40px;
+    border-radius: 50%;
+    font-weight: 700;
+    font-size: 1.1rem;
+    margin: 0 0.5rem;
+}
+
+.step-active {
+    background: #1e3a2e;
+    color: white;
+}
+
+.step-inactive {
+    background: white;
+    color: #94a3b8;
+    border: 2px solid #e2e8f0;
+}
+
+/* Upload card styling */
+.upload-card {
+    background: white;
+    border: 2px dashed #cbd5e1;
+    border-radius: 16px;
+    padding: 1.5rem 1rem;
+    text-align: center;
+    margin: 0.5rem 0;
+    transition: border-color 0.2s;
+}
+
+.upload-card:hover {
+    border-color: #2563eb;
+}
+
+/* Style the file uploader to look clean inside cards */
+[data-testid="stFileUploader"] {
+    background: transparent !important;
+}
+
+[data-testid="stFileUploader"] > div {
+    background: transparent !important;
+    border: none !important;
+    padding: 0 !important;
+}
+
+[data-testid="stFileUploaderDropzone"] {
+    background: transparent !important;
+    border: none !important;
+    padding: 0.5rem 0 !important;
+    min-height: unset !important;
+}
+
+[data-testid="stFileUploaderDropzoneInstructions"] {
+    padding: 0 !important;
+}
+
+.stButton > button {
+    background: #1e3a2e !important;
+    color: white !important;
+    border: none !important;
+    padding: 0.875rem 3rem !important;
+    border-radius: 50px !important;
+    font-weight: 600 !important;
+    font-size: 1.1rem !important;
+    width: 100% !important;
+}
+
+.meal-card {
+    background: #fafaf9;
+    border: 1px solid #e7e5e4;
+    border-radius: 12px;
+    padding: 1.5rem;
+    margin: 1rem 0;
+}
+
+.calorie-badge {
+    background: #fef3c7;
+    color: #92400e;
+    padding: 0.25rem 0.75rem;
+    border-radius: 20px;
+    font-size: 0.875rem;
+    font-weight: 600;
+}
+
+.rec-box {
+    background: #f0fdf4;
+    border: 1px solid #bbf7d0;
+    border-radius: 12px;
+    padding: 1.5rem;
+    margin: 1rem 0;
+}
+
+.limit-box {
+    background: #fef2f2;
+    border: 1px solid #fecaca;
+    border-radius: 12px;
+    padding: 1.5rem;
+    margin: 1rem 0;
+}
+
+.stDownloadButton > button {
+    background: #d97706 !important;
+    color: white !important;
+    border: none !important;
+    padding: 0.75rem 2rem !important;
+    border-radius: 50px !important;
+    font-weight: 600 !important;
+    width: 100% !important;
+    margin: 0.5rem 0 !important;
+}
+"""
+
+HEADER_HTML = """
+<div class="header-bar">
+    <div style="display: flex; align-items: center;">
+        <span style="font-size: 2rem; margin-right: 1rem;">🥗</span>
+        <div>
+            <h1 style="color: white; margin: 0; font-size: 1.75rem; font-weight: 700;">DietPlanner AI</h1>
+            <p style="color: rgba(255,255,255,0.9); margin: 0; font-size: 0.95rem;">Personalised nutrition guidance</p>
+        </div>
+    </div>
+</div>
+"""
+
+
+def _minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).strip()
+
+
+@lru_cache(maxsize=None)
+def page_style():
+    return f"<style>{_minify_css(PAGE_CSS)}</style>"
+
+
+@lru_cache(maxsize=None)
+def header_html():
+    return " ".join(HEADER_HTML.split())
+
+
+MEAL_ICONS = {"Morning": "🌅", "Afternoon": "☀️", "Evening": "🌆", "Night": "🌙"}
+
+
+@lru_cache(maxsize=1024)
+def meal_card_html(time_slot, name, portion, calories, benefit, conditions):
+    # A card only depends on the meal, its slot and the conditions line, and
+    # the same few dozen catalogue meals fill every plan.
+    return " ".join(f"""
+    <div class="meal-card">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
+            <h3 style="color: #1e293b; font-size: 1.25rem; font-weight: 600; margin: 0;">
+                {MEAL_ICONS.get(time_slot, "🍽️")} {time_slot}
+            </h3>
+            <span class="calorie-badge">{calories} kcal</span>
+        </div>
+        <h4 style="color: #1e293b; font-size: 1.1rem; font-weight: 600; margin: 0.5rem 0;">{name}</h4>
+        <p style="color: #64748b; font-size: 0.95rem; margin: 0.5rem 0;">🍴 {portion}</p>
+        <p style="color: #475569; font-size: 0.95rem; margin: 0.75rem 0;">{benefit}</p>
+        <p style="color: #16a34a; font-size: 0.875rem; font-weight: 500; margin: 0.5rem 0;">
+            💊 Clinical recommendation for {conditions}
+        </p>
+    </div>
+    """.split())
+
+
+def day_panels(ids, conditions, summary):
+    # One HTML block per day (meal cards, then the day's totals from the plan
+    # summary), rendered once per plan so switching days is a list lookup.
+    # The meal IDs and the summary's day totals are each read in one pass.
+    from utils.meal_plan import plan_days
+
+    conditions = ", ".join(conditions)
+    return [_day_panel(meals, day, conditions, totals)
+            for day, (meals, totals) in enumerate(zip(plan_days(ids), summary.days.tolist()), start=1)]
+
+
+def replace_panels(panels, ids, conditions, summary, days):
+    # Panels for a plan that only differs from the old one on `days` (1-based).
+    from utils.meal_plan import plan_day
+
+    panels = list(panels)
+    conditions = ", ".join(conditions)
+    for day in days:
+        panels[day - 1] = _day_panel(plan_day(ids, day), day, conditions, summary.days[day - 1].tolist())
+    return panels
+
+
+def _day_panel(meals, day, conditions, totals):
+    # totals: the day's row of the plan summary (calories, protein, carbs, fat).
+    cards = []
+    for slot, m in meals.items():
+        cards.append(meal_card_html(slot, m["name"], m["portion"], m["calories"], m["benefit"], conditions))
+    calories, protein, carbs, fat = totals
+    cards.append(f'<div style="background: #d1fae5; padding: 1.5rem; border-radius: 12px; text-align: center; '
+                 f'margin: 2rem 0;"><h3 style="color: #1e293b; font-weight: 700; margin: 0;">'
+                 f'Day {day} Total: {round(calories)} kcal</h3>'
+                 f'<p style="color: #166534; margin: 0.5rem 0 0 0;">Protein {round(protein, 1):g} g &nbsp;·&nbsp; '
+                 f'Carbs {round(carbs, 1):g} g &nbsp;·&nbsp; Fat {round(fat, 1):g} g</p></div>')
+    return "".join(cards)
+
+
+def summary_html(summary):
+    # Whole-plan figures for the results page; read straight off the summary.
+    from utils.plan_summary import format_nutrients
+
+    totals = summary.as_dict()
+    lines = [
+        f"<b>Daily average:</b> {format_nutrients(totals['daily_average'])}",
+        f"<b>Whole plan:</b> {format_nutrients(totals['total'])}",
+    ]
+    if len(totals["weeks"]) > 1:
+        lines += [f"<b>Week {i}</b> ({w['days']} days): {format_nutrients(w)}"
+                  for i, w in enumerate(totals["weeks"], start=1)]
+    lines += [f"<b>{condition}:</b> suitable meals on {days} of {len(summary)} days"
+              for condition, days in totals["compliant_days"].items()]
+    body = "".join(f'<p style="color: #334155; margin: 0.35rem 0; font-size: 0.95rem;">{line}</p>' for line in lines)
+    return (f'<div style="background: #f8fafc; border: 1px solid #e2e8f0; border-radius: 12px; padding: 1.25rem 1.5rem; '
+            f'margin-bottom: 2rem;"><h4 style="color: #1e293b; font-weight: 700; margin: 0 0 0.75rem 0;">'
+            f'📊 Plan Nutrition</h4>{body}</div>')
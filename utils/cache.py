@@ -0,0 +1,402 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# The in-memory caches below are per process. Extraction, OCR and plan
+# results are also kept in this SQLite file, so every server process on the
+# host shares them and a restart starts warm. "" turns the disk layer off.
+CACHE_DB = os.environ.get("DIETPLANNER_CACHE_DB", os.path.join(tempfile.gettempdir(), "dietplanner_cache.sqlite3"))
+CACHE_TTL = float(os.environ.get("DIETPLANNER_CACHE_TTL_HOURS", 7 * 24)) * 3600
+CACHE_MB = int(os.environ.get("DIETPLANNER_CACHE_MB", 512))
+# Bump when a cached value's shape changes, or when the same key would now
+# compute a different value (2: plan_ids masks the no-repeat window); older
+# entries then never match and age out.
+CACHE_VERSION = 2
+# Reads are counted in memory and written to the file at most this often (or
+# with the next put), so a lookup never opens a write transaction.
+RECORD_INTERVAL = float(os.environ.get("DIETPLANNER_CACHE_RECORD_S", 30))
+
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (name, key)
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (name, accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def content_digest(data, *extra):
+    h = hashlib.sha256()
+    for part in extra:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+def plan_fingerprint(patient, conditions, food_pref, duration, ids, catalog_version):
+    # ids is the (days, slots) meal ID array; hashing its bytes is much cheaper
+    # than serialising the expanded plan.
+    return content_digest(ids.tobytes(), patient, conditions, food_pref, duration, ids.shape, ids.dtype, catalog_version)
+
+
+def _get_writer():
+    # One background thread per process does every disk write, so a cache
+    # miss never waits on SQLite. Re-created after a fork.
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+                _writer_pid = os.getpid()
+    return _writer
+
+
+def _json_dumps(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _tuple_loads(data):
+    return tuple(json.loads(data))
+
+
+def _array_dumps(ids):
+    import numpy as np
+
+    buffer = BytesIO()
+    np.save(buffer, ids, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _array_loads(data):
+    import numpy as np
+
+    # Read-only, like the arrays plan_cache hands out in memory.
+    ids = np.load(BytesIO(data), allow_pickle=False)
+    ids.flags.writeable = False
+    return ids
+
+
+class DiskCache:
+    # One named section of the CACHE_DB file. Values are stored with `dumps`
+    # (JSON or .npy bytes, never pickle) and expire after `ttl` seconds; once
+    # a section holds more than max_bytes, the least recently read entries
+    # go first. WAL mode lets any number of processes read while one writes.
+    def __init__(self, path, name, max_bytes, ttl=CACHE_TTL, dumps=_json_dumps, loads=json.loads):
+        self.path = path
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.errors = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # key -> last read time, and hit/miss counts not yet in the file
+        self._reads = {}
+        self._hits = 0
+        self._misses = 0
+        self._recorded = time.monotonic()
+
+    def _connect(self):
+        # One connection per thread and process; SQLite connections must not
+        # cross a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # A cache can lose its last writes in a power cut; skip the fsyncs.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(DISK_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _key(self, key):
+        return content_digest(repr(key).encode("utf-8"), CACHE_VERSION)
+
+    def get(self, key, default=None):
+        key = self._key(key)
+        try:
+            row = self._connect().execute(
+                "SELECT value, created FROM cache WHERE name = ? AND key = ?", (self.name, key)).fetchone()
+            value = self.loads(row[0]) if row is not None and row[1] >= time.time() - self.ttl else _MISSING
+        except (sqlite3.Error, ValueError, OSError):
+            # A broken or locked cache file reads as a miss, never as an error.
+            self._error()
+            value = _MISSING
+        hit = value is not _MISSING
+        with self._lock:
+            if hit:
+                self._reads[key] = time.time()
+                self._hits += 1
+            else:
+                self._misses += 1
+            due = time.monotonic() - self._recorded >= RECORD_INTERVAL
+            if due:
+                self._recorded = time.monotonic()
+        if due:
+            _get_writer().submit(self._record)
+        return value if hit else default
+
+    def put(self, key, value):
+        _get_writer().submit(self._write, self._key(key), value)
+
+    def flush(self):
+        # Waits for the writes queued so far and records the reads since the
+        # last one.
+        _get_writer().submit(self._record).result()
+
+    def _error(self):
+        with self._lock:
+            self.errors += 1
+
+    def _record(self):
+        with self._lock:
+            pending = self._reads or self._hits or self._misses
+        if not pending:
+            return
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            self._record_reads(conn)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._rollback()
+
+    def _record_reads(self, conn):
+        # Hit/miss counts are kept in the file, so stats() covers every
+        # process on the host; a hit also refreshes the entry's LRU position.
+        # Runs inside the caller's transaction; if that rolls back, the
+        # batch is dropped, which only makes the stats and LRU order a
+        # little stale.
+        with self._lock:
+            reads, hits, misses = self._reads, self._hits, self._misses
+            self._reads, self._hits, self._misses = {}, 0, 0
+            self._recorded = time.monotonic()
+        if reads:
+            conn.executemany("UPDATE cache SET accessed = ? WHERE name = ? AND key = ?",
+                             [(accessed, self.name, key) for key, accessed in reads.items()])
+        if hits or misses:
+            conn.execute("INSERT INTO cache_stats (name, hits, misses) VALUES (?, ?, ?) "
+                         "ON CONFLICT (name) DO UPDATE SET hits = hits + ?, misses = misses + ?",
+                         (self.name, hits, misses, hits, misses))
+
+    def _write(self, key, value):
+        try:
+            data = self.dumps(value)
+        except (TypeError, ValueError):
+            self._error()
+            return
+        if len(data) > self.max_bytes // 4:
+            return  # one entry should not flush a whole section
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            # Pending reads go first so eviction sees current access times.
+            self._record_reads(conn)
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                         (self.name, key, data, len(data), now, now))
+            evicted = conn.execute("DELETE FROM cache WHERE name = ? AND created < ?",
+                                   (self.name, now - self.ttl)).rowcount
+            total = conn.execute("SELECT SUM(size) FROM cache WHERE name = ?", (self.name,)).fetchone()[0]
+            if total > self.max_bytes:
+                # Keep the most recently read entries that fit in max_bytes.
+                evicted += conn.execute(
+                    "DELETE FROM cache WHERE name = ? AND key IN (SELECT key FROM ("
+                    " SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS kept"
+                    " FROM cache WHERE name = ?) WHERE kept > ?)",
+                    (self.name, self.name, self.max_bytes)).rowcount
+            if evicted:
+                conn.execute("INSERT INTO cache_stats (name, evictions) VALUES (?, ?) "
+                             "ON CONFLICT (name) DO UPDATE SET evictions = evictions + ?",
+                             (self.name, evicted, evicted))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._rollback()
+
+    def _rollback(self):
+        self._error()
+        try:
+            self._connect().execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        self.flush()
+        try:
+            self._connect().execute("DELETE FROM cache WHERE name = ?", (self.name,))
+        except sqlite3.Error:
+            self._error()
+
+    def stats(self):
+        # Entries and hit rate across every process using the file.
+        try:
+            conn = self._connect()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE name = ?",
+                                         (self.name,)).fetchone()
+            row = conn.execute("SELECT hits, misses, evictions FROM cache_stats WHERE name = ?",
+                               (self.name,)).fetchone()
+        except sqlite3.Error:
+            return {"path": self.path, "error": True}
+        hits, misses, evictions = row or (0, 0, 0)
+        with self._lock:
+            hits += self._hits
+            misses += self._misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+def disk_cache(name, max_mb, **codec):
+    if not CACHE_DB:
+        return None
+    cache = DiskCache(CACHE_DB, name, max_mb * 1024 * 1024, **codec)
+    # Reads since the last record would otherwise be lost with the process.
+    atexit.register(cache._record)
+    return cache
+
+
+class LRUCache:
+    # With `disk`, a memory miss is looked up in the DiskCache and every put
+    # is written through to it.
+    def __init__(self, max_entries=128, disk=None):
+        self.max_entries = max_entries
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            if self.disk is None:
+                self.misses += 1
+                return default
+        value = self.disk.get(key, _MISSING)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def _remember(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        # compute() runs outside the lock so a slow parse doesn't block other sessions
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+_MISSING = object()
+
+# Module-level caches live for the whole server process, so they are shared by
+# every Streamlit session (app.py itself is re-executed on each rerun).
+# The first three are also backed by CACHE_DB, split 2:1:1.
+extraction_cache = LRUCache(max_entries=64, disk=disk_cache("extraction", CACHE_MB // 2, loads=_tuple_loads))
+report_cache = LRUCache(max_entries=96)
+ocr_cache = LRUCache(max_entries=128, disk=disk_cache("ocr", CACHE_MB // 4))
+plan_cache = LRUCache(max_entries=512, disk=disk_cache("plan", CACHE_MB // 4, dumps=_array_dumps,
+                                                           loads=_array_loads))
+# Pre-rendered Step 3 meal cards, one list of day panels per plan.
+view_cache = LRUCache(max_entries=64)
+summary_cache = LRUCache(max_entries=256)
+
+CACHES = {
+    "extraction": extraction_cache,
+    "report": report_cache,
+    "ocr": ocr_cache,
+    "plan": plan_cache,
+    "view": view_cache,
+    "summary": summary_cache,
+}
+
+
+if __name__ == "__main__":
+    # python -m utils.cache: entries and hit rates of the shared cache file.
+    for cache_name, cache in CACHES.items():
+        if cache.disk is not None:
+            print(cache_name, json.dumps(cache.disk.stats()))
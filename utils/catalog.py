@@ -0,0 +1,127 @@
+import numpy as np
+
+from utils.cache import content_digest
+from utils.conditions import CONDITION_NAMES
+
+SLOTS = ["Morning", "Afternoon", "Evening", "Night"]
+DIETS = ["Vegetarian", "Non-Vegetarian"]
+
+VEG = ["Vegetarian"]
+NONVEG = ["Non-Vegetarian"]
+BOTH = ["Vegetarian", "Non-Vegetarian"]
+
+# Meal IDs are persisted in plans and exports: only ever append new meals.
+# cost: 1 = low, 2 = medium, 3 = high budget. Macros are grams per portion.
+MEALS = [
+    {"id": 0, "slot": "Morning", "diets": VEG, "name": "Oatmeal with banana", "portion": "1 cup cooked oats + 1 medium banana", "calories": 320, "benefit": "High soluble fiber lowers cholesterol and stabilizes blood sugar", "protein": 9, "carbs": 62, "fat": 6, "cost": 1, "tags": ["Diabetes", "High Cholesterol"]},
+    {"id": 1, "slot": "Morning", "diets": VEG, "name": "Poha with vegetables", "portion": "1 plate (200g)", "calories": 250, "benefit": "Light breakfast, easy to digest, provides steady energy", "protein": 6, "carbs": 45, "fat": 6, "cost": 1, "tags": []},
+    {"id": 2, "slot": "Morning", "diets": VEG, "name": "Idli with sambar", "portion": "3 idlis + 1 bowl sambar", "calories": 280, "benefit": "Fermented food aids digestion, low in calories", "protein": 10, "carbs": 52, "fat": 3, "cost": 1, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 3, "slot": "Morning", "diets": VEG, "name": "Upma with coconut chutney", "portion": "1 bowl (200g) + 2 tbsp chutney", "calories": 260, "benefit": "Complex carbs for sustained energy, good source of B vitamins", "protein": 7, "carbs": 40, "fat": 9, "cost": 1, "tags": []},
+    {"id": 4, "slot": "Morning", "diets": VEG, "name": "Whole wheat toast with avocado", "portion": "2 slices + half avocado", "calories": 300, "benefit": "Healthy fats from avocado support heart health", "protein": 8, "carbs": 32, "fat": 16, "cost": 3, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 5, "slot": "Morning", "diets": VEG, "name": "Vegetable dalia porridge", "portion": "1 bowl (250g)", "calories": 240, "benefit": "High fiber, low glycemic index, ideal for diabetes management", "protein": 8, "carbs": 44, "fat": 4, "cost": 1, "tags": ["Diabetes", "High Cholesterol"]},
+    {"id": 6, "slot": "Afternoon", "diets": VEG, "name": "Dal khichdi with curd", "portion": "1 bowl (250g) + 100ml curd", "calories": 300, "benefit": "Complete protein, easy on stomach, good for weight management", "protein": 13, "carbs": 50, "fat": 6, "cost": 1, "tags": ["Hypertension"]},
+    {"id": 7, "slot": "Afternoon", "diets": VEG, "name": "Quinoa vegetable pulao", "portion": "1 bowl (200g)", "calories": 280, "benefit": "High protein grain alternative, gluten-free", "protein": 10, "carbs": 45, "fat": 7, "cost": 3, "tags": ["Diabetes"]},
+    {"id": 8, "slot": "Afternoon", "diets": VEG, "name": "Mixed veg curry with roti", "portion": "2 rotis + 1 bowl curry", "calories": 350, "benefit": "Fiber-rich vegetables support digestive health", "protein": 10, "carbs": 55, "fat": 10, "cost": 1, "tags": ["Diabetes", "Hypertension"]},
+    {"id": 9, "slot": "Afternoon", "diets": VEG, "name": "Rajma rice", "portion": "1 cup rice + 1 bowl rajma", "calories": 380, "benefit": "High protein legume, good for cholesterol management", "protein": 14, "carbs": 66, "fat": 6, "cost": 1, "tags": ["High Cholesterol", "Anemia"]},
+    {"id": 10, "slot": "Afternoon", "diets": VEG, "name": "Palak paneer with brown rice", "portion": "1 bowl curry + 1 cup rice", "calories": 360, "benefit": "Iron-rich spinach combined with protein from paneer", "protein": 16, "carbs": 44, "fat": 14, "cost": 2, "tags": ["Anemia"]},
+    {"id": 11, "slot": "Afternoon", "diets": VEG, "name": "Vegetable biryani with raita", "portion": "1 plate (250g) + 100ml raita", "calories": 340, "benefit": "Balanced meal with aromatic spices that aid digestion", "protein": 9, "carbs": 58, "fat": 9, "cost": 2, "tags": []},
+    {"id": 12, "slot": "Evening", "diets": VEG, "name": "Mixed vegetable soup", "portion": "1 bowl (300ml)", "calories": 120, "benefit": "Low calorie, high micronutrient density supports weight management", "protein": 4, "carbs": 20, "fat": 3, "cost": 1, "tags": ["Diabetes", "Hypertension", "Kidney Concern"]},
+    {"id": 13, "slot": "Evening", "diets": VEG, "name": "Paneer tikka salad", "portion": "150g paneer + salad", "calories": 280, "benefit": "High protein, calcium-rich, supports bone health", "protein": 18, "carbs": 10, "fat": 18, "cost": 2, "tags": ["Diabetes"]},
+    {"id": 14, "slot": "Evening", "diets": VEG, "name": "Vegetable cutlets", "portion": "2 pieces", "calories": 180, "benefit": "Nutrient-dense snack with minimal oil", "protein": 4, "carbs": 24, "fat": 8, "cost": 1, "tags": []},
+    {"id": 15, "slot": "Evening", "diets": VEG, "name": "Sprouts chaat", "portion": "1 bowl (150g)", "calories": 140, "benefit": "Sprouted legumes have enhanced nutrition and enzyme activity", "protein": 9, "carbs": 22, "fat": 2, "cost": 1, "tags": ["Diabetes", "Anemia"]},
+    {"id": 16, "slot": "Evening", "diets": VEG, "name": "Roasted makhana", "portion": "1 cup (30g)", "calories": 110, "benefit": "Low calorie, high protein snack good for blood sugar", "protein": 4, "carbs": 20, "fat": 1, "cost": 2, "tags": ["Diabetes", "Hypertension", "Kidney Concern"]},
+    {"id": 17, "slot": "Evening", "diets": VEG, "name": "Fruit salad with chia seeds", "portion": "1 bowl + 1 tsp chia", "calories": 160, "benefit": "Antioxidants and omega-3s from chia support heart health", "protein": 3, "carbs": 32, "fat": 3, "cost": 2, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 18, "slot": "Night", "diets": BOTH, "name": "Warm turmeric milk", "portion": "200ml low-fat milk + pinch turmeric", "calories": 90, "benefit": "Anti-inflammatory properties, supports overnight recovery", "protein": 6, "carbs": 10, "fat": 2, "cost": 1, "tags": []},
+    {"id": 19, "slot": "Night", "diets": VEG, "name": "Chamomile tea", "portion": "1 cup", "calories": 5, "benefit": "Promotes better sleep, aids digestion", "protein": 0, "carbs": 1, "fat": 0, "cost": 1, "tags": ["Hypertension", "Kidney Concern"]},
+    {"id": 20, "slot": "Night", "diets": VEG, "name": "Almond milk", "portion": "200ml unsweetened", "calories": 60, "benefit": "Low calorie, rich in vitamin E, supports bone health", "protein": 1, "carbs": 2, "fat": 5, "cost": 2, "tags": ["High Cholesterol", "Kidney Concern"]},
+    {"id": 21, "slot": "Night", "diets": BOTH, "name": "Warm ginger lemon water", "portion": "1 cup with ginger + lemon", "calories": 10, "benefit": "Boosts metabolism, anti-inflammatory, aids digestion", "protein": 0, "carbs": 3, "fat": 0, "cost": 1, "tags": ["Hypertension", "Kidney Concern"]},
+    {"id": 22, "slot": "Morning", "diets": NONVEG, "name": "Egg white omelette with toast", "portion": "3 egg whites + 2 whole wheat toast", "calories": 280, "benefit": "High protein, low fat, supports muscle maintenance", "protein": 20, "carbs": 30, "fat": 5, "cost": 1, "tags": ["Diabetes", "High Cholesterol"]},
+    {"id": 23, "slot": "Morning", "diets": NONVEG, "name": "Boiled eggs with fruit", "portion": "2 boiled eggs + 1 apple", "calories": 260, "benefit": "Complete protein with vitamins and fiber", "protein": 13, "carbs": 25, "fat": 10, "cost": 1, "tags": ["Diabetes"]},
+    {"id": 24, "slot": "Morning", "diets": NONVEG, "name": "Chicken sandwich", "portion": "Grilled chicken (80g) + whole wheat bread", "calories": 320, "benefit": "Lean protein source, filling breakfast", "protein": 24, "carbs": 34, "fat": 8, "cost": 2, "tags": []},
+    {"id": 25, "slot": "Morning", "diets": NONVEG, "name": "Scrambled eggs with spinach", "portion": "2 eggs + 1 cup spinach", "calories": 240, "benefit": "Iron and protein combination ideal for anemia prevention", "protein": 14, "carbs": 5, "fat": 17, "cost": 1, "tags": ["Anemia"]},
+    {"id": 26, "slot": "Morning", "diets": NONVEG, "name": "Oatmeal with boiled egg", "portion": "1 cup oats + 1 egg", "calories": 310, "benefit": "Soluble fiber from oats paired with protein for sustained energy", "protein": 14, "carbs": 40, "fat": 10, "cost": 1, "tags": ["Diabetes", "High Cholesterol"]},
+    {"id": 27, "slot": "Morning", "diets": NONVEG, "name": "Greek yogurt with nuts", "portion": "150g yogurt + 20g mixed nuts", "calories": 280, "benefit": "Probiotics for gut health, healthy fats for satiety", "protein": 16, "carbs": 15, "fat": 16, "cost": 3, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 28, "slot": "Afternoon", "diets": NONVEG, "name": "Grilled chicken breast with salad", "portion": "150g chicken + mixed salad", "calories": 248, "benefit": "Lean protein supports muscle maintenance without raising LDL", "protein": 38, "carbs": 8, "fat": 6, "cost": 2, "tags": ["Diabetes", "High Cholesterol"]},
+    {"id": 29, "slot": "Afternoon", "diets": NONVEG, "name": "Fish curry with rice", "portion": "100g fish + 1 cup brown rice", "calories": 380, "benefit": "Omega-3 fatty acids from fish strongly support heart health", "protein": 26, "carbs": 45, "fat": 9, "cost": 2, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 30, "slot": "Afternoon", "diets": NONVEG, "name": "Chicken stir-fry with vegetables", "portion": "150g chicken + 1 cup mixed veg", "calories": 290, "benefit": "High protein, balanced macros, quick energy source", "protein": 32, "carbs": 14, "fat": 11, "cost": 2, "tags": ["Diabetes"]},
+    {"id": 31, "slot": "Afternoon", "diets": NONVEG, "name": "Grilled salmon with quinoa", "portion": "120g salmon + 1 cup quinoa", "calories": 420, "benefit": "Highest omega-3 content, complete protein, anti-inflammatory", "protein": 34, "carbs": 35, "fat": 14, "cost": 3, "tags": ["High Cholesterol", "Hypertension", "Thyroid Disorder"]},
+    {"id": 32, "slot": "Afternoon", "diets": NONVEG, "name": "Egg rice bowl", "portion": "1 cup brown rice + 2 eggs + veg", "calories": 360, "benefit": "Balanced macronutrient meal, excellent for sustained energy", "protein": 18, "carbs": 48, "fat": 10, "cost": 1, "tags": []},
+    {"id": 33, "slot": "Afternoon", "diets": NONVEG, "name": "Tuna whole wheat wrap", "portion": "100g tuna + 1 whole wheat wrap", "calories": 340, "benefit": "Lean protein, omega-3s, complex carbs for steady glucose", "protein": 28, "carbs": 36, "fat": 8, "cost": 2, "tags": ["Diabetes", "High Cholesterol"]},
+    {"id": 34, "slot": "Evening", "diets": NONVEG, "name": "Chicken soup", "portion": "1 bowl (300ml)", "calories": 180, "benefit": "Protein-rich, hydrating, easy to digest", "protein": 16, "carbs": 10, "fat": 7, "cost": 1, "tags": []},
+    {"id": 35, "slot": "Evening", "diets": NONVEG, "name": "Tuna salad", "portion": "100g tuna + mixed vegetables", "calories": 200, "benefit": "Omega-3 rich, supports cardiovascular health", "protein": 24, "carbs": 8, "fat": 7, "cost": 2, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 36, "slot": "Evening", "diets": NONVEG, "name": "Grilled fish fingers", "portion": "3 pieces (100g)", "calories": 150, "benefit": "Low calorie, high protein evening snack option", "protein": 18, "carbs": 8, "fat": 5, "cost": 2, "tags": ["Diabetes"]},
+    {"id": 37, "slot": "Evening", "diets": NONVEG, "name": "Boiled egg salad", "portion": "2 eggs + cucumber + tomato", "calories": 170, "benefit": "Nutrient-dense, filling snack with healthy fats", "protein": 13, "carbs": 6, "fat": 10, "cost": 1, "tags": ["Diabetes"]},
+    {"id": 38, "slot": "Night", "diets": NONVEG, "name": "Green tea", "portion": "1 cup", "calories": 5, "benefit": "Antioxidants, promotes better sleep quality", "protein": 0, "carbs": 1, "fat": 0, "cost": 1, "tags": ["High Cholesterol", "Hypertension"]},
+    {"id": 39, "slot": "Night", "diets": NONVEG, "name": "Protein shake", "portion": "1 scoop whey + water", "calories": 120, "benefit": "Supports muscle recovery and tissue repair overnight", "protein": 24, "carbs": 3, "fat": 2, "cost": 3, "tags": []},
+]
+
+
+class MealCatalog:
+    def __init__(self, meals, slots=SLOTS, diets=DIETS, conditions=CONDITION_NAMES):
+        if [m["id"] for m in meals] != list(range(len(meals))):
+            raise ValueError("meal ids must run 0..n-1 in order")
+        self.slots = list(slots)
+        self.diets = list(diets)
+        self.conditions = list(conditions)
+        # Identifies this exact catalog, so stored ID plans can be checked against it.
+        self.version = content_digest(repr(meals).encode("utf-8"))[:12]
+
+        # Row i describes meal ID i. The dicts are the shape plans and reports
+        # have always used; they are built once and shared, never mutated.
+        self.meals = tuple(
+            {"name": m["name"], "portion": m["portion"], "calories": m["calories"], "benefit": m["benefit"]}
+            for m in meals
+        )
+        self.names = [m["name"] for m in meals]
+        self.slot = np.array([self.slots.index(m["slot"]) for m in meals], dtype=np.int8)
+        self.calories = np.array([m["calories"] for m in meals], dtype=np.int32)
+        self.protein = np.array([m["protein"] for m in meals], dtype=np.float32)
+        self.carbs = np.array([m["carbs"] for m in meals], dtype=np.float32)
+        self.fat = np.array([m["fat"] for m in meals], dtype=np.float32)
+        self.cost = np.array([m["cost"] for m in meals], dtype=np.int8)
+        self.diet_mask = np.array([[d in m["diets"] for d in self.diets] for m in meals], dtype=bool).reshape(-1, len(self.diets))
+        self.tag_mask = np.array([[c in m["tags"] for c in self.conditions] for m in meals], dtype=bool).reshape(-1, len(self.conditions))
+
+        all_ids = np.arange(len(meals))
+        self.by_slot = {s: all_ids[self.slot == i] for i, s in enumerate(self.slots)}
+        self.by_diet = {d: all_ids[self.diet_mask[:, i]] for i, d in enumerate(self.diets)}
+        self.by_tag = {c: all_ids[self.tag_mask[:, i]] for i, c in enumerate(self.conditions)}
+        self._by_diet_slot = {
+            (d, s): all_ids[self.diet_mask[:, di] & (self.slot == si)]
+            for di, d in enumerate(self.diets)
+            for si, s in enumerate(self.slots)
+        }
+
+    def __len__(self):
+        return len(self.meals)
+
+    def meal(self, meal_id):
+        return self.meals[meal_id]
+
+    def ids_for(self, diet, slot):
+        return self._by_diet_slot[(diet, slot)]
+
+    def filter(self, diet=None, slot=None, tags=None, max_cost=None):
+        mask = np.ones(len(self.meals), dtype=bool)
+        if diet is not None:
+            mask &= self.diet_mask[:, self.diets.index(diet)]
+        if slot is not None:
+            mask &= self.slot == self.slots.index(slot)
+        if tags:
+            columns = [self.conditions.index(t) for t in tags if t in self.conditions]
+            if columns:
+                mask &= self.tag_mask[:, columns].any(axis=1)
+        if max_cost is not None:
+            mask &= self.cost <= max_cost
+        return np.flatnonzero(mask)
+
+    def total_calories(self, ids):
+        return int(self.calories[np.asarray(ids)].sum())
+
+
+def diet_for(food_pref):
+    # The UI only ever offers these two; anything else has always meant non-veg.
+    return "Vegetarian" if food_pref == "Vegetarian" else "Non-Vegetarian"
+
+
+CATALOG = MealCatalog(MEALS)
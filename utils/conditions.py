@@ -0,0 +1,100 @@
+import re
+
+# One vocabulary for every consumer: synonym -> condition. Multi-word terms
+# match across any run of whitespace, and every term is matched on word
+# boundaries ("hbp" no longer fires inside other words), with an optional
+# plural ending ("diabetics", "kidneys").
+CONDITION_KEYWORDS = {
+    "Diabetes": [
+        "diabetes", "diabetic", "diabetes mellitus", "prediabetes", "prediabetic",
+        "t2dm", "t1dm", "type 2 diabetes", "type 1 diabetes", "hyperglycemia", "hyperglycaemia",
+    ],
+    "High Cholesterol": [
+        "cholesterol", "high cholesterol", "hyperlipidemia", "hyperlipidaemia",
+        "hypercholesterolemia", "hypercholesterolaemia", "dyslipidemia", "dyslipidaemia",
+    ],
+    "Hypertension": [
+        "hypertension", "hypertensive", "high blood pressure", "elevated blood pressure", "hbp", "htn",
+    ],
+    "Anemia": [
+        "anemia", "anaemia", "anemic", "anaemic", "hemoglobin", "haemoglobin", "iron deficiency",
+    ],
+    "Thyroid Disorder": [
+        "thyroid", "hypothyroid", "hyperthyroid", "hypothyroidism", "hyperthyroidism", "thyroiditis",
+    ],
+    "Kidney Concern": [
+        "kidney", "renal", "ckd", "chronic kidney disease", "nephropathy",
+    ],
+}
+
+CONDITION_NAMES = list(CONDITION_KEYWORDS)
+DEFAULT_CONDITION = "General Health"
+
+
+def _normalize(term):
+    return " ".join(term.lower().split())
+
+
+def _trie_pattern(terms):
+    # Fold the vocabulary into a prefix trie and emit it as one regex, so each
+    # text position is tested against shared prefixes instead of every term.
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items())
+            if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, table):
+        self.table = table
+        self.lookup = {}
+        for condition, terms in table.items():
+            for term in terms:
+                self.lookup[_normalize(term)] = condition
+        # ASCII case folding only: with Unicode folding "ſ" or "İ" would match
+        # a term yet lower() to something that is not in the lookup.
+        self.pattern = re.compile(r"\b(?P<term>" + _trie_pattern(self.lookup) + r")(?:e?s)?\b",
+                                  re.IGNORECASE | re.ASCII)
+
+    def find(self, text):
+        # condition -> [(start, end, term), ...], in a single scan of the text
+        found = {}
+        for m in self.pattern.finditer(text):
+            term = _normalize(m.group("term"))
+            condition = self.lookup.get(term)
+            if condition is not None:
+                found.setdefault(condition, []).append((m.start(), m.end(), term))
+        return found
+
+    def conditions(self, text):
+        found = self.find(text)
+        return [c for c in self.table if c in found]
+
+
+MATCHER = KeywordMatcher(CONDITION_KEYWORDS)
+
+
+def find_conditions(text):
+    return MATCHER.find(text)
+
+
+def detect_conditions(text):
+    cond = MATCHER.conditions(text)
+    return cond if cond else [DEFAULT_CONDITION]
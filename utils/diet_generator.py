@@ -1,5 +1,8 @@
+from utils.conditions import find_conditions
+
+
 def generate_diet(text):
-    text = text.lower()
+    found = find_conditions(text)
 
     diet = {
         "condition": "",
@@ -9,17 +12,17 @@ def generate_diet(text):
         "lifestyle_advice": ""
     }
 
-    if "diabetes" in text:
+    if "Diabetes" in found:
         diet["condition"] += "Diabetes "
         diet["restricted_foods"].append("sugar")
         diet["diet_plan"] += "Follow diabetic diet. "
         diet["lifestyle_advice"] += "Walk daily. "
 
-    if "cholesterol" in text:
+    if "High Cholesterol" in found:
         diet["condition"] += "Cholesterol "
         diet["restricted_foods"].append("oily food")
 
-    if "blood pressure" in text or "hypertension" in text:
+    if "Hypertension" in found:
         diet["condition"] += "Hypertension "
         diet["restricted_foods"].append("salt")
 
@@ -1,28 +1,335 @@
-import pdfplumber
-import pytesseract
-from PIL import Image
-import pandas as pd
+import os
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 
-def extract_text(uploaded_file):
+from utils.conditions import detect_conditions, find_conditions
+from utils.labs import find_lab_values, lab_row, lab_values
+from utils.metrics import ENABLED as METRICS_ENABLED, collected, count, merge as merge_metrics, timed
+from utils.ml_predictor import FEATURES
+from utils.ocr import OCR_MAX_SIDE, ocr_image_bytes
+
+# Below this many pages a process pool costs more to start than it saves.
+PARALLEL_MIN_PAGES = 48
+PAGES_PER_TASK = 8
+MAX_PDF_PAGES = 300
+# With early_exit, reading stops once this many pages in a row add nothing
+# new (name, condition or lab value) after something has been found.
+EARLY_EXIT_IDLE_PAGES = 3
+IMAGE_TYPES = ["image/png", "image/jpeg", "image/jpg", "image/tiff"]
+
+# Uploads are routed by their leading bytes, so a mislabelled or
+# extension-less file still reaches the right backend. Text and CSV have no
+# signature; for those the declared type or extension decides.
+SNIFF_BYTES = 2048
+MAGIC = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),
+    (b"II*\x00", "image"),
+    (b"MM\x00*", "image"),
+]
+TYPE_HINTS = {"application/pdf": "pdf", "text/plain": "txt", "text/csv": "csv", **{t: "image" for t in IMAGE_TYPES}}
+EXTENSION_HINTS = {"pdf": "pdf", "txt": "txt", "csv": "csv", "png": "image", "jpg": "image", "jpeg": "image",
+                   "tif": "image", "tiff": "image"}
+
+# Lab exports can run to hundreds of thousands of rows: read them in bounded
+# chunks and only the columns the planner and the model use.
+CSV_TEXT_COLUMN = "doctor_prescription"
+CSV_NUMERIC_DTYPES = {
+    "age": "float64",
+    "glucose": "float64",
+    "cholesterol": "float64",
+    "blood_pressure": "float64",
+    "bmi": "float64",
+}
+CSV_CHUNK_ROWS = 10000
+CSV_PREVIEW_ROWS = 1000
+
+_worker_pdf = None
+_worker_ocr = False
+
+# format -> fn(file, **options) returning the report text; see @extractor.
+EXTRACTORS = {}
+
+
+def _init_pdf_worker(data, ocr=False):
+    import pdfplumber
+
+    # Parsed once per worker; every page range it is sent reads from it.
+    global _worker_pdf, _worker_ocr
+    _worker_pdf = pdfplumber.open(BytesIO(data))
+    _worker_ocr = ocr
+
+
+def _extract_page_range(start, stop):
+    return [page_text(page, _worker_ocr) for page in _worker_pdf.pages[start:stop]]
+
+
+def ocr_pdf_page(page):
+    # Rendered just large enough for OCR_MAX_SIDE, so preprocess never has to
+    # shrink it again. A page that fails OCR (no tesseract, broken image)
+    # reads as empty; the rest of the document keeps its text layer.
+    resolution = 72 * OCR_MAX_SIDE / max(page.width, page.height)
+    try:
+        buffer = BytesIO()
+        page.to_image(resolution=resolution).original.convert("L").save(buffer, format="PNG")
+        count("pages_ocr", stage="extract")
+        return ocr_image_bytes(buffer.getvalue())
+    except Exception:
+        count("pages_ocr_failed", stage="extract")
+        return ""
+
+
+def page_text(page, ocr=False):
+    # The text layer when there is one. With ocr, a page that has no text
+    # but does hold an image (a scan bound into a digital PDF) is OCR'd on
+    # its own; blank pages are not.
+    text = page.extract_text() or ""
+    if ocr and not text.strip() and page.images:
+        text = ocr_pdf_page(page)
+    page.close()
+    return text
+
+
+def iter_pdf_pages(source, max_pages=None, workers=None, progress=None, ocr=False):
+    # Yields one text string per page ("" for pages without a text layer,
+    # unless ocr is set), calling extract_text once per page and releasing
+    # each page's cached objects as soon as it has been read.
+    # progress(done, total) is called as pages complete.
+    import pdfplumber
+
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    with pdfplumber.open(source) as pdf:
+        n_pages = len(pdf.pages)
+        if max_pages:
+            n_pages = min(n_pages, max_pages)
+
+        if not workers or workers < 2 or n_pages < PARALLEL_MIN_PAGES:
+            for i, page in enumerate(pdf.pages[:n_pages], start=1):
+                text = page_text(page, ocr)
+                if progress:
+                    progress(i, n_pages)
+                yield text
+            return
+
+    source.seek(0)
+    data = source.read()
+    # spawn, not fork: the caller is usually a threaded Streamlit server
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pdf_worker,
+        initargs=(data, ocr),
+    )
+    futures = [
+        pool.submit(collected, _extract_page_range, start, min(start + PAGES_PER_TASK, n_pages))
+        for start in range(0, n_pages, PAGES_PER_TASK)
+    ]
+    try:
+        done = 0
+        for future in futures:
+            texts, observed = future.result()
+            merge_metrics(observed)
+            done += len(texts)
+            if progress:
+                progress(done, n_pages)
+            yield from texts
+    finally:
+        # Early exit by the consumer: drop the ranges nobody will read. The
+        # ones already running (one per worker) are waited for, since
+        # workers left behind would block the exit of a calling worker
+        # process (a background job).
+        pool.shutdown(cancel_futures=True)
+
+
+def iter_csv_chunks(source, chunksize=CSV_CHUNK_ROWS):
+    # Yields (texts, values) per chunk: a list of prescription strings and a
+    # float array of CSV_NUMERIC_DTYPES columns (NaN where a column is absent).
+    import pandas as pd
+
+    wanted = {CSV_TEXT_COLUMN, *CSV_NUMERIC_DTYPES}
+    reader = pd.read_csv(
+        source,
+        usecols=lambda column: column in wanted,
+        dtype={CSV_TEXT_COLUMN: "object", **CSV_NUMERIC_DTYPES},
+        chunksize=chunksize,
+    )
+    numeric_columns = list(CSV_NUMERIC_DTYPES)
+    for chunk in reader:
+        if CSV_TEXT_COLUMN in chunk:
+            texts = [t if isinstance(t, str) else "" for t in chunk[CSV_TEXT_COLUMN]]
+        else:
+            texts = [""] * len(chunk)
+        yield texts, chunk.reindex(columns=numeric_columns).to_numpy(dtype=float)
+
+
+def iter_csv_records(source, chunksize=CSV_CHUNK_ROWS):
+    # One (text, numeric_data) record per patient row.
+    numeric_columns = list(CSV_NUMERIC_DTYPES)
+    for texts, values in iter_csv_chunks(source, chunksize):
+        for text, row in zip(texts, values.tolist()):
+            yield text, dict(zip(numeric_columns, row))
+
+
+def default_pdf_workers():
+    return min(4, os.cpu_count() or 1)
+
+
+def sniff_format(file):
+    # "pdf", "image", "csv" or "txt" for an upload; see MAGIC.
+    file.seek(0)
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+    for magic, kind in MAGIC:
+        if head.startswith(magic):
+            return kind
+    if b"%PDF-" in head[:1024]:
+        # The spec lets a PDF header follow some leading junk.
+        return "pdf"
+    name = getattr(file, "name", "") or ""
+    hinted = TYPE_HINTS.get(getattr(file, "type", None)) or EXTENSION_HINTS.get(name.rsplit(".", 1)[-1].lower())
+    if hinted in ("txt", "csv"):
+        return hinted
+    # No signature and no usable hint: a CSV export still names its columns.
+    header = head.split(b"\n", 1)[0].decode("utf-8", errors="replace").lower()
+    columns = {c.strip().strip('"') for c in header.split(",")}
+    return "csv" if len(columns) > 1 and columns & {CSV_TEXT_COLUMN, *CSV_NUMERIC_DTYPES} else "txt"
+
+
+def extractor(kind):
+    # Registers the decorated function as the backend for one format. Every
+    # backend takes the upload plus the keyword options of
+    # extract_text_from_file and ignores the ones it has no use for.
+    def register(fn):
+        EXTRACTORS[kind] = fn
+        return fn
+    return register
+
+
+def read_pdf_text(file, early_exit=False, max_pages=MAX_PDF_PAGES, workers=1, progress=None, ocr=True):
+    pages = []
+    name_found = False
+    found = set()
+    labs = set()
+    idle = 0
+    for text in iter_pdf_pages(file, max_pages=max_pages, workers=workers, progress=progress, ocr=ocr):
+        if not text:
+            continue
+        count("pages_processed")
+        pages.append(text + "\n")
+        if early_exit:
+            # Stop once the name and every lab field extract_labs reads are
+            # in hand, or once the report has stopped adding anything: most
+            # reports never mention every field or condition.
+            seen = (name_found, len(found), len(labs))
+            name_found = name_found or extract_patient_name(text) != "Patient"
+            found.update(find_conditions(text))
+            if len(labs) < len(FEATURES):
+                labs.update(find_lab_values(text))
+            if name_found and len(labs) == len(FEATURES):
+                break
+            if seen != (name_found, len(found), len(labs)):
+                idle = 0
+            elif name_found or found or labs:
+                idle += 1
+                if idle >= EARLY_EXIT_IDLE_PAGES:
+                    break
+    return "".join(pages)
+
+
+@extractor("pdf")
+def _read_pdf(file, early_exit=False, pdf_workers=1, progress=None, **options):
+    # Text layer page by page; only pages without one go through OCR.
+    return read_pdf_text(file, early_exit=early_exit, workers=pdf_workers, progress=progress)
+
+
+@extractor("txt")
+def _read_txt(file, **options):
+    return file.read().decode("utf-8", errors="replace")
+
+
+@extractor("csv")
+def _read_csv(file, **options):
+    import pandas as pd
+
+    # Single-report view: a bounded preview, not the whole export.
+    # Use iter_csv_records to plan for every row.
+    return pd.read_csv(file, nrows=CSV_PREVIEW_ROWS).to_string()
+
+
+@extractor("image")
+def _read_image(file, **options):
+    return ocr_image_bytes(file.read())
+
+
+@timed("extract")
+def extract_text_from_file(file, early_exit=False, pdf_workers=1, progress=None):
     text = ""
-    numeric_data = None
-    file_type = uploaded_file.name.split(".")[-1].lower()
+    if METRICS_ENABLED:
+        # Any seekable upload, not only BytesIO; sniff_format rewinds it.
+        count("bytes_processed", file.seek(0, os.SEEK_END), stage="extract")
+    try:
+        text = EXTRACTORS[sniff_format(file)](file, early_exit=early_exit, pdf_workers=pdf_workers,
+                                              progress=progress)
+    except Exception:
+        text = "Medical report uploaded"
+    return text
+
+
+def extract_text(uploaded_file):
+    # (text, lab columns or None), sniffed like extract_text_from_file. A CSV
+    # gives its first patient row: prescription text plus lab columns.
+    if sniff_format(uploaded_file) == "csv":
+        return next(iter_csv_records(uploaded_file, chunksize=1), ("", None))
+    return extract_text_from_file(uploaded_file), None
+
+
+@timed("patient_name")
+def extract_patient_name(text):
+    patterns = [
+        r"patient\s*name\s*[:\-]\s*([A-Za-z ]+)",
+        r"name\s*[:\-]\s*([A-Za-z ]+)",
+        r"patient\s*[:\-]\s*([A-Za-z ]+)"
+    ]
+    for p in patterns:
+        m = re.search(p, text, re.I)
+        if m:
+            return m.group(1).strip().split("\n")[0]
+    return "Patient"
+
+
+@timed("conditions")
+def extract_conditions(text):
+    return detect_conditions(text)
+
+
+@timed("labs")
+def extract_labs(text, numeric_data=None):
+    return lab_row(text, numeric_data)
+
+
+def csv_numeric_data(file):
+    # Lab columns of the first patient row of a CSV upload.
+    file.seek(0)
+    return next(iter_csv_records(file, chunksize=1), ("", None))[1]
 
-    if file_type == "pdf":
-        with pdfplumber.open(uploaded_file) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
 
-    elif file_type in ["png", "jpg", "jpeg"]:
-        image = Image.open(uploaded_file)
-        text = pytesseract.image_to_string(image)
+def parse_report(text, numeric_data=None):
+    # Everything the app shows for one report besides its text:
+    # (patient, conditions, lab values, model result). The model result is
+    # None when no lab value was found.
+    from utils.ml_predictor import predict_lab_rows
 
-    elif file_type == "txt":
-        text = uploaded_file.read().decode("utf-8")
+    row = extract_labs(text, numeric_data)
+    return extract_patient_name(text), extract_conditions(text), lab_values(row), predict_lab_rows([row])[0]
 
-    elif file_type == "csv":
-        df = pd.read_csv(uploaded_file)
-        text = df["doctor_prescription"].iloc[0]
-        numeric_data = df.iloc[0].to_dict()
 
-    return text, numeric_data
+def read_report(file, **kwargs):
+    # (text, patient, conditions, lab values, model result) for an upload.
+    text = extract_text_from_file(file, **kwargs)
+    numeric_data = csv_numeric_data(file) if sniff_format(file) == "csv" else None
+    return (text, *parse_report(text, numeric_data))
@@ -0,0 +1,228 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from io import BytesIO
+from multiprocessing import get_context
+
+from utils.cache import content_digest, extraction_cache
+from utils.metrics import collected, merge as merge_metrics
+
+# Job state lives in SQLite so any rerun, browser tab or worker process can
+# read it; the Streamlit session only keeps the job id.
+JOB_DB = os.environ.get("DIETPLANNER_JOB_DB", os.path.join(tempfile.gettempdir(), "dietplanner_jobs.sqlite3"))
+# Heavy jobs (pdfplumber, OCR) running at once on this node; the rest queue.
+JOB_WORKERS = int(os.environ.get("DIETPLANNER_JOB_WORKERS", 2))
+JOB_TTL = 24 * 3600
+# A 300-page PDF would otherwise mean 300 commits; the last page always lands.
+PROGRESS_INTERVAL = 0.25
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    owner INTEGER,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or JOB_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    return conn
+
+
+def _update(job_id, **fields):
+    fields["updated"] = time.time()
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    with closing(connect()) as conn:
+        conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+class ReportBytes(BytesIO):
+    # The parts of Streamlit's UploadedFile that the extractors rely on.
+    def __init__(self, data, content_type, name):
+        super().__init__(data)
+        self.type = content_type
+        self.name = name
+
+
+class _Progress:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.last = 0.0
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if done < total and now - self.last < PROGRESS_INTERVAL:
+            return
+        self.last = now
+        _update(self.job_id, done=done, total=total)
+
+
+# --- worker side ---
+
+def _extract(job_id, data, content_type, name):
+    from utils.extractor import default_pdf_workers, read_report
+
+    # Long PDFs also fan out over pages; the CPUs are split between the jobs
+    # that may run at once.
+    workers = max(1, default_pdf_workers() // JOB_WORKERS)
+    return list(read_report(ReportBytes(data, content_type, name), early_exit=True, pdf_workers=workers,
+                            progress=_Progress(job_id)))
+
+
+def _plan(job_id, food_pref, duration, conditions, budget, seed):
+    from utils.catalog import CATALOG
+    from utils.meal_plan import generate_plan_ids
+
+    # Meal IDs only: the page resolves the meals it shows from the catalogue.
+    ids = generate_plan_ids(food_pref, duration, conditions, budget, seed=seed)
+    return {"ids": ids.tolist(), "catalog_version": CATALOG.version}
+
+
+RUNNERS = {"extract": _extract, "plan": _plan}
+
+
+def _run_job(job_id, kind, args):
+    _update(job_id, status="running")
+    try:
+        result = RUNNERS[kind](job_id, *args)
+    except Exception as e:
+        _update(job_id, status="failed", error=f"{type(e).__name__}: {e}")
+        return None
+    _update(job_id, status="done", result=json.dumps(result))
+    return result
+
+
+# --- submitting side ---
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _recover():
+    # Active jobs whose server process is gone will never finish; mark them
+    # failed so their pages stop polling. Also drop finished jobs past the TTL.
+    now = time.time()
+    with closing(connect()) as conn:
+        rows = conn.execute("SELECT id, owner FROM jobs WHERE status IN (?, ?)", ACTIVE).fetchall()
+        for row in rows:
+            if row["owner"] != os.getpid() and not _pid_alive(row["owner"]):
+                conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                             ("interrupted by a server restart", now, row["id"]))
+        conn.execute("DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated < ?", (*ACTIVE, now - JOB_TTL))
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _recover()
+                # spawn, not fork: the caller is usually a threaded Streamlit server
+                _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
+
+def _insert(kind, params, status="queued", result=None):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with closing(connect()) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, params, result, owner, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, status, json.dumps(params), result, os.getpid(), now, now),
+        )
+    return job_id
+
+
+def _submit(job_id, kind, args):
+    global _pool
+    try:
+        future = _get_pool().submit(collected, _run_job, job_id, kind, args)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory) and took the pool with it.
+        _pool = None
+        future = _get_pool().submit(collected, _run_job, job_id, kind, args)
+
+    def finished(f):
+        # _run_job records its own errors; anything else means the worker died.
+        if f.exception() is not None:
+            _update(job_id, status="failed", error=f"worker failed: {type(f.exception()).__name__}")
+        else:
+            # The worker's stage timings, for this process's /metrics.
+            merge_metrics(f.result()[1])
+
+    future.add_done_callback(finished)
+    return future
+
+
+def submit_extraction(data, content_type, name):
+    # Uploads already parsed by this server finish immediately from the cache.
+    key = content_digest(data, content_type)
+    cached = extraction_cache.get(key)
+    if cached is not None:
+        return _insert("extract", {"name": name}, status="done", result=json.dumps(list(cached)))
+
+    job_id = _insert("extract", {"name": name})
+    future = _submit(job_id, "extract", (data, content_type, name))
+
+    def remember(f):
+        if f.exception() is None and f.result()[0] is not None:
+            extraction_cache.put(key, tuple(f.result()[0]))
+
+    future.add_done_callback(remember)
+    return job_id
+
+
+def submit_plan(patient, food_pref, duration, conditions, budget, seed):
+    # The form values travel with the job so a refreshed page can restore them.
+    params = {"patient": patient, "food_pref": food_pref, "duration": duration,
+              "conditions": list(conditions), "budget": budget, "seed": seed}
+    job_id = _insert("plan", params)
+    _submit(job_id, "plan", (food_pref, duration, list(conditions), budget, seed))
+    return job_id
+
+
+def record_plan_edits(job_id, edits):
+    # Meals swapped on the results page; a refreshed page replays them.
+    job = get_job(job_id)
+    if job is not None and job["kind"] == "plan":
+        _update(job_id, params=json.dumps(dict(job["params"], edits=edits)))
+
+
+def get_job(job_id):
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"]) if job["params"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
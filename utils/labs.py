@@ -0,0 +1,130 @@
+import math
+import re
+
+import numpy as np
+
+from utils.ml_predictor import FEATURES
+
+# Every lab field is found by one combined pattern: a label, a short gap with
+# no line breaks, then the reading and an optional unit. The only numbers the
+# gap may hold belong to the label ("2 hr", "kg/m2", "HbA1c"), never the
+# reading. The gap is bounded, so finditer makes one linear pass over the
+# text however many fields or pages there are.
+LAB_LABELS = {
+    "age": r"age",
+    "glucose": r"(?:fasting\s+|random\s+)?(?:blood\s+|plasma\s+)?glucose|blood\s+sugar|fbs|fbg|rbs",
+    "cholesterol": r"(?:total\s+|serum\s+)?cholesterol",
+    "blood_pressure": r"blood\s+pressure|bp",
+    "bmi": r"bmi|body\s+mass\s+index",
+}
+_NUMBER = r"\d{1,4}(?:\.\d+)?"
+_UNIT = r"mg\s*/\s*dl|mmol\s*/\s*l|mm\s*hg|kpa|kg\s*/\s*m(?:2|²)?"
+_DURATION = r"\s*-?\s*(?:hours?|hrs?|h|minutes?|mins?)\b"
+# "Glucose (mmol/L): 5.6" names the unit before the reading.
+_GAP = rf"(?:(?P<label_unit>{_UNIT})|[^\d\n]|\d{{1,3}}{_DURATION}|(?<=[a-z])\d+)"
+
+# First characters of every label above and of the "54 years old" forms.
+# Checking them before the alternation lets most positions fail on one test.
+_LEAD = r"(?=[abcfgprst]|\d{1,3}\s*-?\s*y)"
+
+LAB_PATTERN = re.compile(
+    r"\b" + _LEAD + r"(?:"
+    + "|".join(f"(?P<{field}>{label})" for field, label in LAB_LABELS.items())
+    + rf")\b{_GAP}{{0,24}}?(?<![a-z\d.])(?P<value>{_NUMBER})(?![\d.]|{_DURATION})"
+    + rf"(?:\s*/\s*(?P<second>{_NUMBER}))?\s*(?P<unit>{_UNIT})?"
+    # "54 years old", "54-year-old", "54 y/o"
+    + r"|\b(?P<age_years>\d{1,3})\s*-?\s*(?:years?|yrs?)\s*-?\s*old\b|\b(?P<age_yo>\d{1,3})\s*y/?o\b",
+    re.IGNORECASE,
+)
+
+# unit -> factor to the units the model was trained on (mg/dL, mmHg)
+UNIT_FACTORS = {
+    "glucose": {"mmol/l": 18.016},
+    "cholesterol": {"mmol/l": 38.67},
+    "blood_pressure": {"kpa": 7.50062},
+}
+# Readings outside these ranges are OCR noise or a different number (a date,
+# a page number) and are skipped.
+PLAUSIBLE = {
+    "age": (0, 120),
+    "glucose": (20, 1000),
+    "cholesterol": (50, 700),
+    "blood_pressure": (20, 250),
+    "bmi": (10, 90),
+}
+# field -> (label, unit) for display
+LAB_DISPLAY = {
+    "age": ("Age", "yrs"),
+    "glucose": ("Glucose", "mg/dL"),
+    "cholesterol": ("Cholesterol", "mg/dL"),
+    "blood_pressure": ("Diastolic BP", "mmHg"),
+    "bmi": ("BMI", "kg/m²"),
+}
+
+
+def _normalize_unit(unit):
+    return re.sub(r"\s+", "", unit.lower()) if unit else ""
+
+
+def _reading(field, m):
+    value = float(m.group("value"))
+    if field == "blood_pressure" and m.group("second"):
+        # "130/85": the model's BloodPressure column is the diastolic reading.
+        value = float(m.group("second"))
+    # Readings are converted only when a unit says so; a unitless 5.6 is not
+    # guessed to be mmol/L and falls outside PLAUSIBLE instead.
+    unit = _normalize_unit(m.group("unit") or m.group("label_unit"))
+    factor = UNIT_FACTORS.get(field, {}).get(unit)
+    if factor:
+        value *= factor
+    low, high = PLAUSIBLE[field]
+    return round(value, 1) if low <= value <= high else None
+
+
+def find_lab_values(text):
+    # field -> value in model units for the first plausible reading of each
+    # field; fields that never appear are left out.
+    found = {}
+    for m in LAB_PATTERN.finditer(text):
+        if m.group("age_years") or m.group("age_yo"):
+            if "age" not in found:
+                age = float(m.group("age_years") or m.group("age_yo"))
+                if age <= PLAUSIBLE["age"][1]:
+                    found["age"] = age
+            continue
+        field = next(f for f in LAB_LABELS if m.group(f) is not None)
+        if field in found:
+            continue
+        value = _reading(field, m)
+        if value is not None:
+            found[field] = value
+            if len(found) == len(FEATURES):
+                break
+    return found
+
+
+def lab_row(text, numeric_data=None):
+    # One FEATURES-ordered row; values supplied as numbers (CSV columns) win
+    # over values read from the text, and missing fields are NaN.
+    found = find_lab_values(text) if text else {}
+    row = []
+    for field in FEATURES:
+        value = (numeric_data or {}).get(field)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            value = found.get(field, math.nan)
+        row.append(float(value))
+    return row
+
+
+def lab_matrix(texts, numeric_rows=None):
+    numeric_rows = numeric_rows or [None] * len(texts)
+    return np.array([lab_row(t, n) for t, n in zip(texts, numeric_rows)], dtype=float).reshape(-1, len(FEATURES))
+
+
+def lab_values(row):
+    # JSON-friendly {field: value} for the fields that were found.
+    return {field: value for field, value in zip(FEATURES, row) if not math.isnan(value)}
+
+
+def describe_labs(labs):
+    return [f"{LAB_DISPLAY[f][0]} {labs[f]:g} {LAB_DISPLAY[f][1]}" for f in FEATURES if f in labs]
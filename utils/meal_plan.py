@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+
+from utils.cache import content_digest, plan_cache, summary_cache
+from utils.catalog import CATALOG
+from utils.metrics import timed
+from utils.plan_engine import plan_ids, plan_to_dict, replan_ids
+from utils.plan_summary import summarize_ids
+
+
+def new_plan_seed():
+    return int.from_bytes(os.urandom(4), "big")
+
+
+def new_plan_edit(day, slot=None):
+    # One swap: the day (1-based), the slot or None for the whole day, and a
+    # seed of its own so the swap can be replayed.
+    return {"day": day, "slot": slot, "seed": new_plan_seed()}
+
+
+@timed("plan")
+def generate_plan_ids(food_pref, duration, conditions=(), budget="Medium", seed=None, edits=()):
+    # Same inputs + same seed (+ same edits, replayed in order) -> same plan,
+    # in any session or process. The result is shared through plan_cache, so
+    # it is returned read-only.
+    if seed is None:
+        seed = new_plan_seed()
+    return _cached_plan_ids(food_pref, duration, conditions, budget, seed, edits)
+
+
+def _cached_plan_ids(food_pref, duration, conditions, budget, seed, edits):
+    # The catalogue version is part of the key: plan_cache outlives restarts
+    # (see utils.cache.CACHE_DB), and a changed catalogue changes the plan.
+    key = (food_pref, duration, tuple(sorted(conditions)), budget, seed,
+           tuple((e["day"], e["slot"], e["seed"]) for e in edits), CATALOG.version)
+
+    def build():
+        if edits:
+            # Built on the cached plan without the last edit.
+            base = _cached_plan_ids(food_pref, duration, conditions, budget, seed, edits[:-1])
+            ids = swap_meals(base, food_pref, conditions, budget, edits[-1])
+        else:
+            ids = plan_ids(food_pref, duration, conditions, budget, rng=np.random.default_rng(seed))
+        ids.flags.writeable = False
+        return ids
+
+    return plan_cache.get_or_compute(key, build)
+
+
+def swap_meals(ids, food_pref, conditions, budget, edit, catalog=CATALOG):
+    # Applies one edit to a copy of `ids` (same dtype). The cached summary of
+    # the old plan is carried over with only the edited day recomputed.
+    new_ids = replan_ids(ids, food_pref, conditions, budget, day=edit["day"], slot=edit["slot"],
+                         rng=np.random.default_rng(edit["seed"]), catalog=catalog).astype(ids.dtype)
+    summary = plan_summary(ids, conditions, catalog).replace_days(new_ids, [edit["day"]])
+    summary_cache.put(_summary_key(new_ids, conditions, catalog), summary)
+    return new_ids
+
+
+def compact_ids(ids, catalog=CATALOG):
+    # Smallest integer type that holds every meal ID: with the bundled
+    # catalogue a 30-day plan is 120 bytes.
+    return np.array(ids, dtype=np.min_scalar_type(len(catalog) - 1))
+
+
+def plan_day(ids, day, catalog=CATALOG):
+    # Resolves one day (1-based) of an ID plan to {slot: meal}.
+    return {slot: catalog.meals[meal_id] for slot, meal_id in zip(catalog.slots, ids[day - 1].tolist())}
+
+
+def plan_days(ids, catalog=CATALOG):
+    # Every day of an ID plan as {slot: meal}, from one pass over the array.
+    return [{slot: catalog.meals[meal_id] for slot, meal_id in zip(catalog.slots, row)} for row in ids.tolist()]
+
+
+@timed("summary")
+def plan_summary(ids, conditions=(), catalog=CATALOG):
+    # Nutrition totals and compliance flags, computed once per plan and shared
+    # by the page and every exporter.
+    return summary_cache.get_or_compute(_summary_key(ids, conditions, catalog),
+                                        lambda: summarize_ids(ids, conditions, catalog))
+
+
+def _summary_key(ids, conditions, catalog):
+    return (content_digest(np.ascontiguousarray(ids).tobytes(), ids.shape, ids.dtype, catalog.version),
+            tuple(conditions))
+
+
+def generate_diet_plan(food_pref, duration, conditions=(), budget="Medium", seed=None, edits=()):
+    return plan_to_dict(generate_plan_ids(food_pref, duration, conditions, budget, seed, edits))
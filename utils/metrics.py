@@ -0,0 +1,167 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Off unless DIETPLANNER_METRICS=1. The switch is read at import time: when it
+# is off, @timed returns the function untouched and the other helpers return
+# immediately, so production code pays nothing for the instrumentation.
+ENABLED = os.environ.get("DIETPLANNER_METRICS", "") not in ("", "0", "false")
+METRICS_PORT = os.environ.get("DIETPLANNER_METRICS_PORT")
+# Loopback unless exposed on purpose (e.g. DIETPLANNER_METRICS_HOST=0.0.0.0
+# for a scraper on another host).
+METRICS_HOST = os.environ.get("DIETPLANNER_METRICS_HOST", "127.0.0.1")
+
+PREFIX = "dietplanner"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count], sum
+_counters = {}  # (name, label value) -> total
+_server = None
+
+
+def observe(stage, seconds):
+    if not ENABLED:
+        return
+    with _lock:
+        entry = _histograms.get(stage)
+        if entry is None:
+            entry = _histograms[stage] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+        entry[0][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        entry[1] += seconds
+
+
+def count(name, value=1, stage=""):
+    if not ENABLED:
+        return
+    with _lock:
+        key = (name, stage)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def timed(stage):
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def drain():
+    # This process's observations since the last drain, as picklable data,
+    # and clears them.
+    if not ENABLED:
+        return None
+    with _lock:
+        observed = (dict(_histograms), dict(_counters))
+        _histograms.clear()
+        _counters.clear()
+    return observed
+
+
+def merge(observed):
+    # Adds observations drained in another process to this one's.
+    if not ENABLED or not observed:
+        return
+    histograms, counters = observed
+    with _lock:
+        for stage, (buckets, total) in histograms.items():
+            entry = _histograms.get(stage)
+            if entry is None:
+                entry = _histograms[stage] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            for i, n in enumerate(buckets):
+                entry[0][i] += n
+            entry[1] += total
+        for key, value in counters.items():
+            _counters[key] = _counters.get(key, 0) + value
+
+
+def collected(fn, *args):
+    # Runs fn in a pool worker and returns (result, observations). The
+    # registry is per process, so the caller merges them into its own to
+    # have worker timings reach /metrics. If fn raises, they stay in the
+    # worker and go back with its next result.
+    result = fn(*args)
+    return result, drain()
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items() if v != "") + "}"
+
+
+def render_prometheus():
+    from utils.cache import CACHES
+
+    with _lock:
+        histograms = {stage: (list(buckets), total) for stage, (buckets, total) in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = [
+        f"# HELP {PREFIX}_stage_seconds Time spent in each report-to-plan stage.",
+        f"# TYPE {PREFIX}_stage_seconds histogram",
+    ]
+    for stage, (buckets, total) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += n
+            lines.append(f"{PREFIX}_stage_seconds_bucket{_labels(stage=stage, le=bound)} {cumulative}")
+        lines.append(f"{PREFIX}_stage_seconds_sum{_labels(stage=stage)} {total}")
+        lines.append(f"{PREFIX}_stage_seconds_count{_labels(stage=stage)} {cumulative}")
+
+    for name in sorted({n for n, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+        for (n, stage), value in sorted(counters.items()):
+            if n == name:
+                label = _labels(stage=stage) if stage else ""
+                lines.append(f"{PREFIX}_{name}_total{label} {value}")
+
+    # Cache counters are kept by the caches themselves; read them at scrape time.
+    # disk_hits are the hits served from the shared cache file (CACHE_DB).
+    for field in ("hits", "misses", "evictions", "disk_hits"):
+        lines.append(f"# TYPE {PREFIX}_cache_{field}_total counter")
+        for cache_name, cache in CACHES.items():
+            lines.append(f"{PREFIX}_cache_{field}_total{_labels(cache=cache_name)} {getattr(cache, field)}")
+    lines.append(f"# TYPE {PREFIX}_cache_entries gauge")
+    for cache_name, cache in CACHES.items():
+        lines.append(f"{PREFIX}_cache_entries{_labels(cache=cache_name)} {len(cache)}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port=None, host=None):
+    # Serves /metrics from a daemon thread; safe to call on every Streamlit rerun.
+    global _server
+    port = port or METRICS_PORT
+    if not ENABLED or not port or _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            found = self.path.split("?")[0] == "/metrics"
+            body = render_prometheus().encode("utf-8") if found else b""
+            self.send_response(200 if found else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host or METRICS_HOST, int(port)), Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
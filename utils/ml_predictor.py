@@ -1,10 +1,76 @@
-import pandas as pd
-import joblib
+import os
+import threading
 
-model = joblib.load("model/lightgbm_model.pkl")
+import numpy as np
 
+from utils.metrics import count, timed
+
+FEATURES = ["age", "glucose", "cholesterol", "blood_pressure", "bmi"]
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model", "lightgbm_model.pkl")
+
+# The bundled model was trained on the Pima diabetes columns. Our lab fields are
+# mapped onto them by name; model inputs we don't collect are passed as NaN,
+# which LightGBM treats as missing.
+MODEL_COLUMN_ALIASES = {"Age": "age", "Glucose": "glucose", "BloodPressure": "blood_pressure", "BMI": "bmi"}
+
+_model = None
+_column_map = None
+_lock = threading.Lock()
+
+
+def get_model():
+    global _model, _column_map
+    if _model is None:
+        with _lock:
+            if _model is None:
+                import joblib
+
+                model = joblib.load(MODEL_PATH)
+                names = list(getattr(model, "feature_name_", None) or FEATURES)
+                sources = [MODEL_COLUMN_ALIASES.get(name, name) for name in names]
+                model_idx = [i for i, src in enumerate(sources) if src in FEATURES]
+                feature_idx = [FEATURES.index(sources[i]) for i in model_idx]
+                _column_map = (len(names), np.array(model_idx, dtype=int), np.array(feature_idx, dtype=int))
+                _model = model
+    return _model
+
+
+def _model_matrix(X):
+    n_columns, model_idx, feature_idx = _column_map
+    out = np.full((X.shape[0], n_columns), np.nan)
+    out[:, model_idx] = X[:, feature_idx]
+    return out
+
+
+@timed("predict_batch")
+def predict_conditions_batch(data):
+    # data: DataFrame with FEATURES columns (missing ones are NaN) or an
+    # (n_patients, len(FEATURES)) array in FEATURES order. One model.predict
+    # call scores the whole cohort.
+    if hasattr(data, "reindex"):
+        X = data.reindex(columns=FEATURES).to_numpy(dtype=float)
+    else:
+        X = np.asarray(data, dtype=float).reshape(-1, len(FEATURES))
+    count("patients_scored", X.shape[0])
+    model = get_model()
+    predictions = model.predict(_model_matrix(X))
+    return np.where(predictions == 1, "Abnormal", "Normal")
+
+
+@timed("predict")
 def predict_condition(numeric_data):
-    features = ["age", "glucose", "cholesterol", "blood_pressure", "bmi"]
-    X = pd.DataFrame([[numeric_data[f] for f in features]], columns=features)
-    prediction = model.predict(X)[0]
-    return "Abnormal" if prediction == 1 else "Normal"
+    row = np.array([[numeric_data.get(f) for f in FEATURES]], dtype=float)
+    return str(predict_conditions_batch(row)[0])
+
+
+def predict_lab_rows(X):
+    # Scores a FEATURES-ordered matrix in one batch; rows without a single
+    # lab value get None rather than a guess from an all-missing input.
+    X = np.asarray(X, dtype=float).reshape(-1, len(FEATURES))
+    has_values = ~np.isnan(X).all(axis=1)
+    results = [None] * X.shape[0]
+    if has_values.any():
+        for i, label in zip(np.flatnonzero(has_values), predict_conditions_batch(X[has_values])):
+            results[i] = str(label)
+    return results
@@ -0,0 +1,107 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from utils.cache import content_digest, ocr_cache
+from utils.metrics import count, timed
+
+# Phone photos arrive at 3000-4000px; tesseract reads printed reports just as
+# well at this size and several times faster.
+OCR_MAX_SIDE = 2000
+# Each OCR call runs a tesseract subprocess, so threads are enough; the bound
+# keeps a burst of uploads from starting dozens of tesseract processes.
+OCR_WORKERS = 2
+OCR_CONFIG = "--psm 3"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _otsu_threshold(gray):
+    hist = gray.histogram()
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best, threshold = 0.0, 128
+    for i, h in enumerate(hist):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def preprocess(image):
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image).convert("L")
+    if max(image.size) > OCR_MAX_SIDE:
+        image.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.Resampling.BILINEAR)
+    image = ImageOps.autocontrast(image)
+    threshold = _otsu_threshold(image)
+    return image.point(lambda p: 255 if p > threshold else 0, mode="1")
+
+
+def iter_frames(image):
+    from PIL import ImageSequence
+
+    # Multi-page TIFF faxes/scans carry one page per frame.
+    for frame in ImageSequence.Iterator(image):
+        yield frame.copy()
+
+
+def ocr_image(image):
+    import pytesseract
+
+    texts = []
+    for frame in iter_frames(image):
+        count("pages_processed", stage="ocr")
+        texts.append(pytesseract.image_to_string(preprocess(frame), config=OCR_CONFIG))
+    return "\n".join(t.strip() for t in texts if t.strip())
+
+
+@timed("ocr")
+def _ocr_bytes_uncached(data):
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        return ocr_image(image)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+    return _pool
+
+
+def submit_ocr(data):
+    # Returns a Future with the OCR text; identical images are served from the
+    # cache without touching the pool.
+    key = content_digest(data, "ocr")
+    cached = ocr_cache.get(key)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+
+    def run():
+        text = _ocr_bytes_uncached(data)
+        ocr_cache.put(key, text)
+        return text
+
+    return _get_pool().submit(run)
+
+
+def ocr_image_bytes(data, timeout=None):
+    return submit_ocr(data).result(timeout=timeout)
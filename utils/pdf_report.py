@@ -0,0 +1,139 @@
+import functools
+from xml.sax.saxutils import escape
+
+from utils.plan_summary import NUTRIENTS, UNITS
+
+# Column widths in points for the day table (A4 frame is ~451pt wide).
+DAY_COLUMNS = (62, 200, 139, 50)
+CELL_PADDING = 6
+FONT, BOLD, CELL_SIZE, NOTE_SIZE = "Helvetica", "Helvetica-Bold", 9, 8
+
+
+@functools.lru_cache(maxsize=1)
+def styles():
+    # Built once per process; ReportLab is only imported on first use.
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    sheet = getSampleStyleSheet()
+    return {"title": sheet["Title"], "normal": sheet["Normal"], "day": sheet["Heading2"]}
+
+
+@functools.lru_cache(maxsize=8)
+def day_style(n_meals):
+    # Every day has the same shape, so the table style is built once per
+    # meal count: a header, then a (meal, benefit) row pair per slot, then
+    # the total row.
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    commands = [
+        ("FONT", (0, 0), (-1, -1), FONT, CELL_SIZE),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1e3a2e")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONT", (0, 0), (-1, 0), BOLD, CELL_SIZE),
+        ("FONT", (0, -1), (-1, -1), BOLD, CELL_SIZE),
+        ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#d1fae5")),
+        ("ALIGN", (-1, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5e1")),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+        ("LEFTPADDING", (0, 0), (-1, -1), CELL_PADDING / 2),
+        ("RIGHTPADDING", (0, 0), (-1, -1), CELL_PADDING / 2),
+    ]
+    for i in range(n_meals):
+        meal_row, note_row = 1 + 2 * i, 2 + 2 * i
+        commands += [
+            ("FONT", (1, meal_row), (1, meal_row), BOLD, CELL_SIZE),
+            ("SPAN", (1, note_row), (-1, note_row)),
+            ("FONT", (1, note_row), (-1, note_row), FONT, NOTE_SIZE),
+            ("TEXTCOLOR", (1, note_row), (-1, note_row), colors.HexColor("#475569")),
+            ("LINEBELOW", (0, meal_row), (-1, meal_row), 0, colors.white),
+        ]
+    return TableStyle(commands)
+
+
+@functools.lru_cache(maxsize=1024)
+def meal_cells(name, portion, benefit):
+    # The same few dozen catalogue meals repeat across every plan: their
+    # cells are line-broken once at the fixed column widths and reused, so
+    # the table lays out plain strings instead of re-wrapping Paragraphs.
+    from reportlab.lib.utils import simpleSplit
+
+    width = lambda column: DAY_COLUMNS[column] - CELL_PADDING
+    return (
+        "\n".join(simpleSplit(name, BOLD, CELL_SIZE, width(1))),
+        "\n".join(simpleSplit(portion, FONT, CELL_SIZE, width(2))),
+        "\n".join(simpleSplit(benefit, FONT, NOTE_SIZE, sum(DAY_COLUMNS[1:]) - CELL_PADDING)),
+    )
+
+
+def day_table(meals, total):
+    from reportlab.platypus import Table
+
+    rows = [["Time", "Meal", "Portion", "kcal"]]
+    for time_slot, meal in meals.items():
+        name, portion, benefit = meal_cells(meal["name"], meal["portion"], meal["benefit"])
+        rows.append([time_slot, name, portion, str(meal["calories"])])
+        rows.append(["", benefit, "", ""])
+    rows.append(["", "Day Total", "", str(total)])
+    table = Table(rows, colWidths=DAY_COLUMNS, repeatRows=1)
+    table.setStyle(day_style(len(meals)))
+    return table
+
+
+@functools.lru_cache(maxsize=1)
+def summary_style():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return TableStyle([
+        ("FONT", (0, 0), (-1, -1), FONT, CELL_SIZE),
+        ("FONT", (0, 0), (-1, 0), BOLD, CELL_SIZE),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1e3a2e")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5e1")),
+    ])
+
+
+def summary_table(summary):
+    from reportlab.platypus import Table
+
+    totals = summary.as_dict()
+    rows = [["", *(n.capitalize() for n in NUTRIENTS)]]
+    labelled = [("Total", totals["total"]), ("Daily average", totals["daily_average"])]
+    if len(totals["weeks"]) > 1:
+        labelled += [(f"Week {i} ({w['days']} days)", w) for i, w in enumerate(totals["weeks"], start=1)]
+    for label, values in labelled:
+        rows.append([label, *(f"{values[n]:g} {UNITS[n]}" for n in NUTRIENTS)])
+    table = Table(rows, colWidths=(131, 80, 80, 80, 80), repeatRows=1)
+    table.setStyle(summary_style())
+    return table
+
+
+def build_pdf(out, patient, conditions, food_pref, duration, full_plan, summary):
+    # Writes the report to `out` (a path or a writable binary file). Day
+    # totals and the closing summary come from the plan's PlanSummary.
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import KeepTogether, Paragraph, SimpleDocTemplate, Spacer
+
+    s = styles()
+    story = [
+        Paragraph(f"<b>DietPlanner AI — {duration} Day Diet Plan</b>", s["title"]),
+        Spacer(1, 12),
+        Paragraph(f"<b>Patient:</b> {escape(patient)}", s["normal"]),
+        Paragraph(f"<b>Conditions:</b> {escape(', '.join(conditions))}", s["normal"]),
+        Paragraph(f"<b>Food Preference:</b> {escape(food_pref)}", s["normal"]),
+        Spacer(1, 16),
+    ]
+    for day, (day_name, meals) in enumerate(full_plan.items(), start=1):
+        story.append(KeepTogether([Paragraph(day_name, s["day"]), day_table(meals, summary.day_calories(day))]))
+        story.append(Spacer(1, 10))
+    compliance = [
+        Paragraph(f"{escape(condition)}: suitable meals on {days} of {len(summary)} days", s["normal"])
+        for condition, days in summary.compliance().items()
+    ]
+    story.append(KeepTogether([Paragraph("Plan Summary", s["day"]), summary_table(summary), Spacer(1, 8), *compliance]))
+    SimpleDocTemplate(out, pagesize=A4, title=f"{duration} Day Diet Plan").build(story)
+
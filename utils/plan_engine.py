@@ -0,0 +1,150 @@
+import numpy as np
+
+from utils.catalog import CATALOG, diet_for
+
+BUDGET_MAX_COST = {"Low": 1, "Medium": 2, "High": 3}
+# Target for the four planned meals; the results page shows this range and
+# how many days fall in it.
+CALORIE_WINDOW = (750, 1000)
+# A meal is not served again in the same slot within this many days, when the
+# slot's pool is large enough to allow it.
+NO_REPEAT_DAYS = 3
+CANDIDATES_PER_DAY = 512
+# How strongly meals tagged for the patient's conditions are favoured.
+CONDITION_WEIGHT = 2.0
+
+# Score weights: one calorie outside the window costs as much as CALORIE_COST,
+# a repeat costs REPEAT_COST, each condition-tagged meal earns CONDITION_BONUS.
+CALORIE_COST = 1.0
+REPEAT_COST = 500.0
+CONDITION_BONUS = 25.0
+# Random jitter added to every score so near-equal days still vary.
+SCORE_JITTER = 10.0
+
+
+def slot_pools(catalog, diet, conditions=(), budget="Medium"):
+    # Per slot: (candidate IDs, draw probabilities, condition score per ID).
+    columns = [catalog.conditions.index(c) for c in conditions if c in catalog.conditions]
+    max_cost = BUDGET_MAX_COST.get(budget, 3)
+    pools = []
+    for slot in catalog.slots:
+        ids = catalog.filter(diet=diet, slot=slot, max_cost=max_cost)
+        if len(ids) == 0:
+            # Nothing in budget for this slot: fall back to the full diet pool.
+            ids = catalog.ids_for(diet, slot)
+        matches = catalog.tag_mask[ids][:, columns].sum(axis=1) if columns else np.zeros(len(ids))
+        weights = 1.0 + CONDITION_WEIGHT * matches
+        pools.append((ids, weights / weights.sum(), matches.astype(float)))
+    return pools
+
+
+def _allowed(ids, used):
+    # Pool indices whose meal is not in `used`, or None when that leaves
+    # nothing (the caller then draws from the whole pool and only the
+    # REPEAT_COST score keeps repeats down). Pools and windows are a handful
+    # of IDs, where a broadcast compare beats np.isin.
+    keep = np.flatnonzero((ids[:, None] != used[None, :]).all(axis=1))
+    return keep if len(keep) else None
+
+
+def _draw(allowed, probs, rng, size):
+    p = probs[allowed]
+    return allowed[rng.choice(len(allowed), size=size, p=p / p.sum())]
+
+
+def _grid(columns):
+    # Every combination of the given index columns, one row each.
+    return np.stack(np.meshgrid(*columns, indexing="ij"), axis=-1).reshape(-1, len(columns))
+
+
+def plan_ids(food_pref, duration, conditions=(), budget="Medium", rng=None, catalog=CATALOG,
+             calorie_window=CALORIE_WINDOW, no_repeat_days=NO_REPEAT_DAYS, candidates=CANDIDATES_PER_DAY):
+    # Returns a (duration, n_slots) array of meal IDs. Each day, `candidates`
+    # whole-day combinations are drawn at once (condition-weighted, within
+    # budget) and scored in bulk on calorie window and condition fit. Meals
+    # served in the same slot within the no-repeat window are taken out of
+    # the pools before drawing.
+    rng = rng if rng is not None else np.random.default_rng()
+    pools = slot_pools(catalog, diet_for(food_pref), conditions, budget)
+    n_slots = len(pools)
+    low, high = calorie_window
+    windows = [min(no_repeat_days, len(ids) - 1) for ids, _, _ in pools]
+
+    # Small catalogs: score every combination exactly instead of sampling.
+    exhaustive = int(np.prod([len(ids) for ids, _, _ in pools])) <= candidates
+
+    plan = np.empty((duration, n_slots), dtype=np.int32)
+    everything = [np.arange(len(ids)) for ids, _, _ in pools]
+    for day in range(duration):
+        recent = [plan[max(0, day - windows[s]):day, s] for s in range(n_slots)]
+        masked = [_allowed(ids, r) for (ids, _, _), r in zip(pools, recent)]
+        allowed = [a if a is not None else e for a, e in zip(masked, everything)]
+        if exhaustive:
+            picks = _grid(allowed)
+        else:
+            picks = np.column_stack([_draw(a, probs, rng, candidates) for a, (_, probs, _) in zip(allowed, pools)])
+        draws = np.empty(picks.shape, dtype=np.intp)
+        score = rng.random(len(picks)) * SCORE_JITTER
+        for s, (ids, probs, matches) in enumerate(pools):
+            draws[:, s] = ids[picks[:, s]]
+            score -= CONDITION_BONUS * matches[picks[:, s]]
+            if masked[s] is None:
+                score += REPEAT_COST * np.isin(draws[:, s], recent[s])
+        calories = catalog.calories[draws].sum(axis=1)
+        score += CALORIE_COST * (np.maximum(low - calories, 0) + np.maximum(calories - high, 0))
+        plan[day] = draws[np.argmin(score)]
+    return plan
+
+
+def replan_ids(ids, food_pref, conditions=(), budget="Medium", day=1, slot=None, rng=None, catalog=CATALOG,
+               calorie_window=CALORIE_WINDOW, no_repeat_days=NO_REPEAT_DAYS, candidates=CANDIDATES_PER_DAY):
+    # Redraws one day (1-based), or one slot of it, under the same rules as
+    # plan_ids; every other meal stays put. The no-repeat window covers the
+    # days on both sides, since later days are already planned, and the
+    # meals being swapped out are excluded too. Returns a new array: plans
+    # from plan_cache are shared and read-only.
+    rng = rng if rng is not None else np.random.default_rng()
+    plan = np.array(ids, dtype=np.int32)
+    pools = slot_pools(catalog, diet_for(food_pref), conditions, budget)
+    d = day - 1
+    redraw = list(range(len(pools))) if slot is None else [catalog.slots.index(slot)]
+
+    used = {}
+    allowed = []
+    for s in redraw:
+        ids_s = pools[s][0]
+        # Small pools cannot always avoid 2 * window neighbours: narrow the
+        # window until some meal is left, so the repeat is as far off as
+        # the pool allows.
+        for window in range(min(no_repeat_days, len(ids_s) - 1), -1, -1):
+            nearby = np.concatenate([plan[max(0, d - window):d, s], plan[d + 1:d + 1 + window, s]])
+            used[s] = np.append(nearby, plan[d, s]) if len(ids_s) > 1 else nearby
+            keep = _allowed(ids_s, used[s])
+            if keep is not None:
+                break
+        allowed.append(keep if keep is not None else np.arange(len(ids_s)))
+
+    if int(np.prod([len(a) for a in allowed])) <= candidates:
+        # Every combination fits: score them all.
+        picks = _grid(allowed)
+    else:
+        picks = np.column_stack([_draw(a, pools[s][1], rng, candidates) for a, s in zip(allowed, redraw)])
+    draws = np.repeat(plan[d][None, :], len(picks), axis=0)
+    score = rng.random(len(picks)) * SCORE_JITTER
+    for i, s in enumerate(redraw):
+        ids_s, probs, matches = pools[s]
+        draws[:, s] = ids_s[picks[:, i]]
+        score -= CONDITION_BONUS * matches[picks[:, i]]
+        score += REPEAT_COST * np.isin(draws[:, s], used[s])
+    low, high = calorie_window
+    calories = catalog.calories[draws].sum(axis=1)
+    score += CALORIE_COST * (np.maximum(low - calories, 0) + np.maximum(calories - high, 0))
+    plan[d] = draws[np.argmin(score)]
+    return plan
+
+
+def plan_to_dict(ids, catalog=CATALOG):
+    return {
+        f"Day {day}": {slot: catalog.meals[meal_id] for slot, meal_id in zip(catalog.slots, row)}
+        for day, row in enumerate(ids.tolist(), start=1)
+    }
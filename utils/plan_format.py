@@ -0,0 +1,124 @@
+import functools
+import json
+
+# Schema 1 is the original report: every day embeds full copies of its meals.
+# Schema 2 stores each distinct meal once, keyed by catalogue ID, and each day
+# as a list of IDs in slot order.
+SCHEMA_VERSION = 2
+
+_encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+
+@functools.lru_cache(maxsize=4)
+def _meal_index(catalog):
+    # Plans built by the engine share the catalogue's meal dicts, so most
+    # lookups are by identity; plans that went through JSON fall back to name.
+    by_identity = {id(meal): i for i, meal in enumerate(catalog.meals)}
+    by_name = {meal["name"]: i for i, meal in enumerate(catalog.meals)}
+    return by_identity, by_name
+
+
+def compact_plan(full_plan, catalog=None):
+    # Returns (slots, meals, days) with meals as {id: meal dict}.
+    if catalog is None:
+        from utils.catalog import CATALOG as catalog
+
+    by_identity, by_name = _meal_index(catalog)
+    slots = list(next(iter(full_plan.values()))) if full_plan else list(catalog.slots)
+    meals = {}
+    extra = {}  # meals that are not in the catalogue get IDs after it
+    days = []
+    for day in full_plan.values():
+        row = []
+        for slot in slots:
+            meal = day[slot]
+            meal_id = by_identity.get(id(meal))
+            if meal_id is None:
+                meal_id = by_name.get(meal["name"])
+                if meal_id is None or catalog.meals[meal_id] != meal:
+                    key = (meal["name"], meal["portion"], meal["calories"], meal["benefit"])
+                    meal_id = extra.setdefault(key, len(catalog) + len(extra))
+            if meal_id not in meals:
+                meals[meal_id] = meal
+            row.append(meal_id)
+        days.append(row)
+    return slots, meals, days
+
+
+def plan_document(patient, conditions, food_pref, duration, full_plan, seed=None, summary=None, edits=None):
+    from utils.catalog import CATALOG
+
+    slots, meals, days = compact_plan(full_plan, CATALOG)
+    doc = {
+        "schema": SCHEMA_VERSION,
+        "patient_name": patient,
+        "medical_conditions": conditions,
+        "food_preference": food_pref,
+        "duration_days": duration,
+        "catalog_version": CATALOG.version,
+        "slots": slots,
+        "meals": {str(meal_id): meal for meal_id, meal in sorted(meals.items())},
+        "days": days,
+    }
+    if summary is not None:
+        doc["nutrition_summary"] = summary.as_dict()
+    if seed is not None:
+        doc["plan_seed"] = seed
+        if edits:
+            doc["plan_edits"] = edits
+    return doc
+
+
+def dumps_compact(doc):
+    return _encoder.encode(doc)
+
+
+def iter_ndjson(docs):
+    # One compact document per line, for streaming many plans to a file or socket.
+    for doc in docs:
+        yield _encoder.encode(doc) + "\n"
+
+
+def write_ndjson(out, docs):
+    written = 0
+    for line in iter_ndjson(docs):
+        out.write(line)
+        written += 1
+    return written
+
+
+def expand_plan(doc):
+    # Rebuilds the {"Day N": {slot: meal}} shape the app and reports use.
+    meals = {int(meal_id): meal for meal_id, meal in doc["meals"].items()}
+    slots = doc["slots"]
+    return {
+        f"Day {day}": {slot: meals[meal_id] for slot, meal_id in zip(slots, row)}
+        for day, row in enumerate(doc["days"], start=1)
+    }
+
+
+def load_plan(data):
+    # Accepts a schema 1 or 2 document (dict, str or bytes) and returns it in
+    # the schema 1 layout, with the plan under "meal_plan".
+    doc = json.loads(data) if isinstance(data, (str, bytes, bytearray)) else data
+    if doc.get("schema", 1) == 1:
+        return doc
+    if doc["schema"] != SCHEMA_VERSION:
+        raise ValueError(f"unsupported plan schema: {doc['schema']}")
+    loaded = {
+        "patient_name": doc["patient_name"],
+        "medical_conditions": doc["medical_conditions"],
+        "food_preference": doc["food_preference"],
+        "duration_days": doc["duration_days"],
+        "meal_plan": expand_plan(doc),
+    }
+    for key in ("nutrition_summary", "plan_seed", "plan_edits"):
+        if key in doc:
+            loaded[key] = doc[key]
+    return loaded
+
+
+def iter_ndjson_plans(lines):
+    for line in lines:
+        if line.strip():
+            yield load_plan(line)
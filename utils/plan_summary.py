@@ -0,0 +1,119 @@
+import copy
+
+import numpy as np
+
+from utils.catalog import CATALOG
+from utils.plan_engine import CALORIE_WINDOW
+
+NUTRIENTS = ["calories", "protein", "carbs", "fat"]
+UNITS = {"calories": "kcal", "protein": "g", "carbs": "g", "fat": "g"}
+DAYS_PER_WEEK = 7
+# A day counts as compliant for a condition when at least this many of its
+# meals are tagged for it.
+COMPLIANT_MEALS = 1
+
+
+class PlanSummary:
+    # Nutrition totals and condition flags for one plan, computed once from
+    # its meal matrix. Views and exporters only read from it.
+    def __init__(self, table, tags, rows, conditions):
+        # table: (n_meals, len(NUTRIENTS)) nutrients per meal, tags: (n_meals,
+        # len(conditions)) bool, rows: (days, slots) meal indices into both.
+        self.table = table
+        self.tags = tags
+        self.conditions = list(conditions)
+        self.days = table[rows].sum(axis=1)
+        self.meal_flags = tags[rows]  # (days, slots, conditions)
+        self._aggregate()
+
+    def _aggregate(self):
+        # Everything derived from the per-day rows, cheap to redo after a swap.
+        starts = np.arange(0, len(self.days), DAYS_PER_WEEK)
+        self.weeks = np.add.reduceat(self.days, starts, axis=0) if len(self.days) else self.days
+        self.week_lengths = np.diff(np.append(starts, len(self.days)))
+        self.total = self.days.sum(axis=0)
+        self.average = self.total / max(len(self.days), 1)
+        self.condition_meals = self.meal_flags.sum(axis=1)  # (days, conditions)
+        self.compliant = self.condition_meals >= COMPLIANT_MEALS
+        low, high = CALORIE_WINDOW
+        calories = self.days[:, NUTRIENTS.index("calories")]
+        self.in_calorie_window = (calories >= low) & (calories <= high)
+
+    def replace_days(self, rows, days):
+        # Summary of a plan that differs from this one only on `days`
+        # (1-based): only those day rows are looked up again.
+        new = copy.copy(self)
+        changed = np.asarray(days, dtype=np.intp) - 1
+        rows = np.asarray(rows, dtype=np.intp)
+        new.days = self.days.copy()
+        new.meal_flags = self.meal_flags.copy()
+        new.days[changed] = self.table[rows[changed]].sum(axis=1)
+        new.meal_flags[changed] = self.tags[rows[changed]]
+        new._aggregate()
+        return new
+
+    def __len__(self):
+        return len(self.days)
+
+    def day(self, day):
+        # {nutrient: value} for a 1-based day.
+        return _values(self.days[day - 1])
+
+    def day_calories(self, day):
+        return int(self.days[day - 1, 0])
+
+    def compliance(self):
+        # condition -> number of compliant days
+        return {c: int(n) for c, n in zip(self.conditions, self.compliant.sum(axis=0))}
+
+    def as_dict(self):
+        return {
+            "nutrients": NUTRIENTS,
+            "total": _values(self.total),
+            "daily_average": _values(self.average),
+            "weeks": [dict(_values(week), days=int(n)) for week, n in zip(self.weeks, self.week_lengths)],
+            "days": [_values(day) for day in self.days],
+            "days_in_calorie_window": int(self.in_calorie_window.sum()),
+            "compliant_days": self.compliance(),
+        }
+
+
+def _values(row):
+    # Calories stay whole numbers, macros get one decimal.
+    return {n: int(round(v)) if n == "calories" else round(float(v), 1) for n, v in zip(NUTRIENTS, row.tolist())}
+
+
+def format_nutrients(values):
+    # "812 kcal, protein 31.5 g, carbs 120 g, fat 20.5 g"
+    return ", ".join([f"{values['calories']} kcal"] + [f"{n} {values[n]:g} {UNITS[n]}" for n in NUTRIENTS[1:]])
+
+
+def _catalog_table(catalog):
+    return np.column_stack([catalog.calories, catalog.protein, catalog.carbs, catalog.fat]).astype(float)
+
+
+def summarize_ids(ids, conditions=(), catalog=CATALOG):
+    # ids: (days, slots) catalogue meal IDs, as kept by the app and planner.
+    columns = [catalog.conditions.index(c) for c in conditions if c in catalog.conditions]
+    tags = catalog.tag_mask[:, columns]
+    known = [catalog.conditions[i] for i in columns]
+    rows = np.asarray(ids, dtype=np.intp).reshape(-1, len(catalog.slots))
+    return PlanSummary(_catalog_table(catalog), tags, rows, known)
+
+
+def summarize_plan(full_plan, conditions=(), catalog=CATALOG):
+    # Same summary for a {"Day N": {slot: meal}} plan. Meals that are not in
+    # the catalogue (edited or imported plans) count their own calories and
+    # no macros or condition tags.
+    from utils.plan_format import compact_plan
+
+    slots, meals, days = compact_plan(full_plan, catalog)
+    columns = [catalog.conditions.index(c) for c in conditions if c in catalog.conditions]
+    extra = max(meals, default=len(catalog) - 1) + 1 - len(catalog)
+    table = np.vstack([_catalog_table(catalog), np.zeros((max(extra, 0), len(NUTRIENTS)))])
+    tags = np.vstack([catalog.tag_mask[:, columns], np.zeros((max(extra, 0), len(columns)), dtype=bool)])
+    for meal_id, meal in meals.items():
+        if meal_id >= len(catalog):
+            table[meal_id, 0] = meal["calories"]
+    rows = np.array(days, dtype=np.intp).reshape(-1, len(slots))
+    return PlanSummary(table, tags, rows, [catalog.conditions[i] for i in columns])
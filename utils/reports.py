@@ -0,0 +1,92 @@
+import json
+from io import BytesIO
+
+from utils.metrics import timed
+
+
+def _summary(summary, full_plan, conditions):
+    # Callers that built the plan pass its summary (meal_plan.plan_summary);
+    # plans that arrive as dicts are summarized here. utils.plan_summary
+    # loads numpy, so it is imported by the renderers rather than at the top:
+    # app.py imports this module for the Step 1 render.
+    if summary is not None:
+        return summary
+    from utils.plan_summary import summarize_plan
+
+    return summarize_plan(full_plan, conditions)
+
+
+@timed("report_pdf")
+def generate_pdf_report(patient, conditions, food_pref, duration, full_plan, summary=None):
+    # Imported here so ReportLab only loads once someone downloads a PDF.
+    from utils.pdf_report import build_pdf
+
+    buffer = BytesIO()
+    build_pdf(buffer, patient, conditions, food_pref, duration, full_plan, _summary(summary, full_plan, conditions))
+    buffer.seek(0)
+    return buffer
+
+
+@timed("report_txt")
+def generate_txt_report(patient, conditions, food_pref, duration, full_plan, summary=None):
+    summary = _summary(summary, full_plan, conditions)
+    report = f"DIETPLANNER AI — {duration} DAY DIET PLAN\n"
+    report += "=" * 60 + "\n\n"
+    report += f"Patient: {patient}\n"
+    report += f"Medical Conditions: {', '.join(conditions)}\n"
+    report += f"Food Preference: {food_pref}\n"
+    report += f"Duration: {duration} Days\n\n"
+    report += "=" * 60 + "\n\n"
+    for day, (day_name, meals) in enumerate(full_plan.items(), start=1):
+        report += f"{day_name.upper()}\n" + "-" * 60 + "\n"
+        for time_slot, meal in meals.items():
+            report += f"\n{time_slot}:\n"
+            report += f"  Meal: {meal['name']}\n"
+            report += f"  Portion: {meal['portion']}\n"
+            report += f"  Calories: {meal['calories']} kcal\n"
+            report += f"  Benefit: {meal['benefit']}\n"
+        report += f"\nDay Total: {summary.day_calories(day)} kcal\n"
+        report += "=" * 60 + "\n\n"
+    report += summary_text(summary)
+    return report
+
+
+def summary_text(summary):
+    from utils.plan_summary import format_nutrients
+
+    totals = summary.as_dict()
+    report = "PLAN SUMMARY\n" + "-" * 60 + "\n"
+    report += f"Total: {format_nutrients(totals['total'])}\n"
+    report += f"Daily average: {format_nutrients(totals['daily_average'])}\n"
+    if len(totals["weeks"]) > 1:
+        for week, values in enumerate(totals["weeks"], start=1):
+            report += f"Week {week} ({values['days']} days): {format_nutrients(values)}\n"
+    for condition, days in totals["compliant_days"].items():
+        report += f"{condition}: suitable meals on {days} of {len(summary)} days\n"
+    return report
+
+
+@timed("report_json")
+def generate_json_report(patient, conditions, food_pref, duration, full_plan, seed=None, schema=1, summary=None,
+                         edits=None):
+    summary = _summary(summary, full_plan, conditions)
+    if schema == 2:
+        from utils.plan_format import dumps_compact, plan_document
+
+        return dumps_compact(plan_document(patient, conditions, food_pref, duration, full_plan, seed=seed,
+                                           summary=summary, edits=edits))
+    data = {
+        "patient_name": patient,
+        "medical_conditions": conditions,
+        "food_preference": food_pref,
+        "duration_days": duration,
+        "meal_plan": full_plan,
+        "nutrition_summary": summary.as_dict(),
+    }
+    if seed is not None:
+        # With the inputs above, the seed reproduces this exact plan (after
+        # replaying plan_edits, the meals swapped since, in order).
+        data["plan_seed"] = seed
+        if edits:
+            data["plan_edits"] = edits
+    return json.dumps(data, indent=2)